@@ -5,12 +5,27 @@ import requests
 import uuid
 import time
 import hashlib
+import hmac
 import secrets
+import socket
 import re
 import subprocess
 import mimetypes
 import json
-from flask import Flask, render_template, request, jsonify, Response
+import shutil
+import threading
+import random
+import functools
+import zipfile
+from collections import deque
+from queue import Empty, Queue
+from contextlib import contextmanager
+import sqlite3
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, FIRST_EXCEPTION
+from flask import Flask, render_template, request, jsonify, Response, Request
+from requests.adapters import HTTPAdapter
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
@@ -18,35 +33,125 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024  # 100MB max
-app.config["UPLOAD_FOLDER"] = tempfile.gettempdir()
+app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER", os.path.join(tempfile.gettempdir(), "transcripator_uploads"))
 app.config["JSON_AS_ASCII"] = False  # Preserve unicode (umlauts etc.)
 
-# In-memory stores
-job_store = {}
-pow_store = {}
+
+class UploadRequest(Request):
+    @property
+    def max_content_length(self):
+        # A batch carries many files, so it gets its own body limit (each file is still capped)
+        if self.endpoint == "batch_endpoint":
+            return BATCH_MAX_BYTES
+        return super().max_content_length
+
+
+app.request_class = UploadRequest
 
 # Config
 PORT = int(os.getenv("PORT", "5000"))
 DEBUG = os.getenv("FLASK_ENV", "development") == "development"
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))  # Reverse proxies in front whose X-Forwarded-For is trusted
+
+# Job / PoW store config ("memory" is per-process; "sqlite" is shared by all workers)
+STORE_BACKEND = os.getenv("STORE_BACKEND", "memory")
+STORE_PATH = os.getenv("STORE_PATH", os.path.join(tempfile.gettempdir(), "transcripator.db"))
 
 # Proof-of-Work config
 POW_EXPIRES_SECONDS = 300
-POW_DIFFICULTY = 4
+POW_DIFFICULTY = int(os.getenv("POW_DIFFICULTY", "4"))
+POW_MAX_DIFFICULTY = int(os.getenv("POW_MAX_DIFFICULTY", "6"))
+POW_LOAD_STEP = int(os.getenv("POW_LOAD_STEP", "8"))  # In-flight jobs per extra difficulty level
+POW_LOAD_REFRESH_SECONDS = 5  # How long a worker reuses its in-flight job count
+POW_VALIDATED_TTL = 300  # Seconds a solved challenge stays usable for an upload
+POW_SPENT_BUCKET_SECONDS = 60  # Granularity of spent-challenge eviction
+POW_SECRET = os.getenv("POW_SECRET")  # HMAC key; generated and shared via the store if unset
 
 # API config
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 OPENROUTER_MODEL = "google/gemini-3-flash-preview"
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/audio/transcriptions")
 GROQ_MAX_FILE_SIZE = 24 * 1024 * 1024  # 24MB
 
+# Provider HTTP client config (pooled sessions, concurrency limits, retries)
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "8"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "4"))
+PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "1.0"))  # Seconds, doubled per retry
+PROVIDER_BACKOFF_MAX = float(os.getenv("PROVIDER_BACKOFF_MAX", "30"))
+PROVIDER_CONNECT_TIMEOUT = 10
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Background preprocessing (ffmpeg) config
+FFMPEG_WORKERS = int(os.getenv("FFMPEG_WORKERS", "2"))  # Max concurrent preprocessing ffmpeg jobs
+JOB_STATUS_POLL_SECONDS = 0.5
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "32"))  # Max concurrent transcribe/improve/summary runs
+EVENT_POLL_SECONDS = 0.1  # How often SSE readers poll the SQLite event log
+EVENT_KEEPALIVE_SECONDS = 15
+PIPELINE_HEARTBEAT_SECONDS = 10  # How often a running pipeline refreshes its claim
+PIPELINE_LEASE_SECONDS = 60  # A claim not refreshed for this long is taken over (its worker died)
+PREPROCESS_TIMEOUT_SECONDS = int(os.getenv("PREPROCESS_TIMEOUT_SECONDS", "900"))  # Max time a job sits in one status
+SSE_COALESCE_SECONDS = int(os.getenv("SSE_COALESCE_MS", "40")) / 1000  # Token batching window per SSE frame
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "4096"))  # Flush a frame early at this size
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))  # Concurrent batch files per process, shared by all clients
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(1024 * 1024 * 1024)))  # Whole batch request body
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))  # Chunk size of resumable uploads
+TRANSCRIBE_HEDGE = os.getenv("TRANSCRIBE_HEDGE", "failover")  # off | failover | hedge (race Gemini when Groq is slow)
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "5"))
+HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", "60"))  # Until enough samples exist
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200  # Recent Groq latencies kept for the p95
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))  # Jobs idle this long are removed with their files
+UPLOAD_QUOTA_BYTES = int(os.getenv("UPLOAD_QUOTA_BYTES", str(10 * 1024 * 1024 * 1024)))  # 0 disables
+JANITOR_INTERVAL_SECONDS = int(os.getenv("JANITOR_INTERVAL_SECONDS", "60"))
+ORPHAN_GRACE_SECONDS = 300  # Files without a job are left alone this long (upload may still be registering)
+METRICS_PUBLISH_SECONDS = 5  # How often each worker publishes its metrics to the store for /metrics
+
+# Single-pass media pipeline config (speech-optimized mono 16 kHz Opus)
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_MAX_KBPS = int(os.getenv("SPEECH_MAX_KBPS", "48"))
+SPEECH_MIN_KBPS = 12
+SPEECH_SIZE_HEADROOM = 0.95  # Leave room for container overhead under the provider limit
+
+# Map-reduce summarization config (long transcripts)
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", "6000"))  # Token budget per map call
+IMPROVE_WINDOW_TOKENS = int(os.getenv("IMPROVE_WINDOW_TOKENS", "3000"))  # Longer transcripts are improved in windows
+IMPROVE_WORKERS = int(os.getenv("IMPROVE_WORKERS", "4"))  # Concurrent windows per transcript
+IMPROVE_CONTEXT_CHARS = 600  # Neighbouring text shown (not rewritten) on each side of a window
+SUMMARY_MAP_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "4"))
+CHARS_PER_TOKEN = 4  # Rough estimate, good enough for budgeting
+
+# Chunked Groq transcription config (long recordings)
+GROQ_CHUNK_SECONDS = int(os.getenv("GROQ_CHUNK_SECONDS", "600"))  # Target chunk length
+GROQ_CHUNK_MAX_SECONDS = int(os.getenv("GROQ_CHUNK_MAX_SECONDS", "780"))  # Hard cut if no silence found
+GROQ_CHUNK_WORKERS = int(os.getenv("GROQ_CHUNK_WORKERS", "4"))
+GROQ_CHUNK_RETRIES = int(os.getenv("GROQ_CHUNK_RETRIES", "3"))
+GROQ_CHUNK_BITRATE = os.getenv("GROQ_CHUNK_BITRATE", "48k")
+SILENCE_NOISE_DB = -30
+SILENCE_MIN_SECONDS = 0.5
+VAD_TRIM = os.getenv("VAD_TRIM", "false").lower() in ("1", "true", "yes")  # Cut long silences before upload
+VAD_NOISE_DB = float(os.getenv("VAD_NOISE_DB", "-35"))
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "2"))
+VAD_PADDING_SECONDS = 0.3  # Silence kept on each side of a cut so word edges survive
+VAD_MIN_SAVING_SECONDS = 5  # Below this, re-encoding costs more than it saves
+
+# Result cache config (content-addressed by SHA-256 of the upload)
+CACHE_FOLDER = os.getenv("CACHE_FOLDER", os.path.join(tempfile.gettempdir(), "transcripator_cache"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0"))  # Opt-in: 0 disables (nothing kept past the job)
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(24 * 3600)))  # Entries unused this long are dropped
+CACHE_RESULT_KEYS = ("original_transcription", "improved_transcription", "summary")
+
 # Constants
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 SUPPORTED_EXTENSIONS = {
     "mp3", "wav", "ogg", "m4a", "mp4", "aac", "webm", "wma", "aiff", "flac", "mov", "mkv",
 }
+# Formats ffmpeg can decode from a pipe without seeking (used by streaming ingest)
+STREAMABLE_EXTENSIONS = {"mp3", "wav", "ogg", "webm", "mkv", "flac", "aac", "aiff"}
 SUPPORTED_MIMETYPES = {
     "audio/mpeg", "audio/mp3", "audio/wav", "audio/wave", "audio/ogg",
     "audio/x-m4a", "audio/mp4", "audio/aac", "audio/x-wav", "audio/webm",
@@ -59,41 +164,447 @@ AUDIO_FORMAT_MAP = {
     "mp4": "mp4", "aac": "aac", "flac": "flac", "webm": "webm",
 }
 
+if TRUSTED_PROXIES:
+    # request.remote_addr becomes the client address the outermost trusted proxy saw
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+
+# --- Job / PoW stores ---
+# Both backends implement the same interface. Jobs are key/value maps per
+# job_id. PoW challenges are stateless signed tokens; the store only keeps the
+# set of spent challenges (bucketed by expiry) so a solved challenge can pay
+# for exactly one upload, even across processes. Each job also has an
+# append-only event log (ids 1, 2, ...) that SSE readers replay and follow.
+# Workers also publish metric snapshots there so /metrics can sum them.
+
+class MemoryStore:
+    """Process-local store (single worker only)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.updated = {}  # job_id -> time of the last write
+        self.spent = {}  # Expiry bucket -> set of spent challenges
+        self.events = {}  # job_id -> list of serialized events
+        self.events_changed = threading.Condition(self.lock)
+        self.metrics = {}  # worker -> (time published, snapshot)
+        self.secret = secrets.token_hex(32)
+
+    def job_exists(self, job_id):
+        return job_id in self.jobs
+
+    def job_set(self, job_id, key, value):
+        with self.lock:
+            self.jobs.setdefault(job_id, {})[key] = value
+            self.updated[job_id] = time.time()
+
+    def job_get(self, job_id, key):
+        return self.jobs.get(job_id, {}).get(key)
+
+    def job_get_all(self, job_id):
+        return dict(self.jobs.get(job_id, {}))
+
+    def job_delete_key(self, job_id, key):
+        with self.lock:
+            self.jobs.get(job_id, {}).pop(key, None)
+
+    def job_claim(self, job_id, key, value):
+        """Set key only if it is unset. Returns True if this call set it."""
+        with self.lock:
+            job = self.jobs.setdefault(job_id, {})
+            if key in job:
+                return False
+            job[key] = value
+            self.updated[job_id] = time.time()
+            return True
+
+    def job_update(self, job_id, key, value):
+        """Set key only if the job exists (was not cleaned up). Returns True if this call set it."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job[key] = value
+            self.updated[job_id] = time.time()
+            return True
+
+    def job_compare_and_set(self, job_id, key, expected, value):
+        """Set key only if its current value equals expected. Returns True if this call set it."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.get(key) != expected:
+                return False
+            job[key] = value
+            self.updated[job_id] = time.time()
+            return True
+
+    def job_pop(self, job_id):
+        with self.lock:
+            self.events.pop(job_id, None)
+            self.updated.pop(job_id, None)
+            return self.jobs.pop(job_id, {})
+
+    def job_count(self):
+        return len(self.jobs)
+
+    def job_activity(self):
+        """Return {job_id: time of its last write} for every job."""
+        with self.lock:
+            return {job_id: self.updated.get(job_id, 0.0) for job_id in self.jobs}
+
+    def inflight_job_count(self, statuses, heartbeat_after):
+        """Count jobs preprocessing (status in statuses) or with a live, unfinished pipeline run."""
+        with self.lock:
+            return sum(
+                1 for job in self.jobs.values()
+                if job.get("status") in statuses
+                or ((job.get("pipeline_lease") or {}).get("heartbeat", 0) > heartbeat_after
+                    and not job.get("pipeline_finished"))
+            )
+
+    def events_append(self, job_id, data):
+        """Append a serialized event to the job's log; returns its event id."""
+        with self.events_changed:
+            log = self.events.setdefault(job_id, [])
+            log.append(data)
+            self.events_changed.notify_all()
+            return len(log)
+
+    def events_since(self, job_id, after, timeout=0):
+        """Return [(event_id, data)] logged after event id `after`, waiting up to timeout for one."""
+        with self.events_changed:
+            self.events_changed.wait_for(lambda: len(self.events.get(job_id, ())) > after, timeout)
+            return list(enumerate(self.events.get(job_id, [])[after:], after + 1))
+
+    def pow_spend(self, challenge, expires):
+        """Mark a challenge as spent. Returns False if it was already spent."""
+        bucket = int(expires // POW_SPENT_BUCKET_SECONDS)
+        with self.lock:
+            if any(challenge in spent for spent in self.spent.values()):
+                return False
+            self.spent.setdefault(bucket, set()).add(challenge)
+            return True
+
+    def pow_evict_spent(self, now):
+        """Drop whole buckets whose challenges have all expired (they can't be replayed anyway)."""
+        current = int(now // POW_SPENT_BUCKET_SECONDS)
+        with self.lock:
+            for bucket in [b for b in self.spent if b < current]:
+                del self.spent[bucket]
+
+    def pow_spent_count(self):
+        return sum(len(spent) for spent in self.spent.values())
+
+    def metrics_put(self, worker, snapshot):
+        with self.lock:
+            self.metrics[worker] = (time.time(), snapshot)
+
+    def metrics_all(self):
+        """Return {worker: (time published, snapshot)} for every worker that ever published."""
+        with self.lock:
+            return dict(self.metrics)
+
+    def shared_secret(self):
+        return self.secret
+
+
+class SQLiteStore:
+    """SQLite (WAL) store shared by any number of workers/containers on one volume."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            updated REAL NOT NULL,
+            PRIMARY KEY (job_id, key)
+        );
+        CREATE TABLE IF NOT EXISTS pow_spent (
+            challenge TEXT PRIMARY KEY,
+            bucket INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pow_spent_bucket ON pow_spent (bucket);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            job_id TEXT NOT NULL,
+            event_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (job_id, event_id)
+        );
+        CREATE TABLE IF NOT EXISTS metrics (
+            worker TEXT PRIMARY KEY,
+            updated REAL NOT NULL,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn().executescript(self.SCHEMA)
+
+    def conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement updates use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self.local.conn = conn
+        return conn
+
+    def job_exists(self, job_id):
+        return self.conn().execute("SELECT 1 FROM jobs WHERE job_id = ? LIMIT 1", (job_id,)).fetchone() is not None
+
+    def job_set(self, job_id, key, value):
+        self.conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, key, value, updated) VALUES (?, ?, ?, ?)",
+            (job_id, key, json.dumps(value, ensure_ascii=False), time.time()),
+        )
+
+    def job_get(self, job_id, key):
+        row = self.conn().execute("SELECT value FROM jobs WHERE job_id = ? AND key = ?", (job_id, key)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def job_get_all(self, job_id):
+        rows = self.conn().execute("SELECT key, value FROM jobs WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def job_delete_key(self, job_id, key):
+        self.conn().execute("DELETE FROM jobs WHERE job_id = ? AND key = ?", (job_id, key))
+
+    def job_claim(self, job_id, key, value):
+        """Set key only if it is unset. Returns True if this call set it."""
+        cursor = self.conn().execute(
+            "INSERT OR IGNORE INTO jobs (job_id, key, value, updated) VALUES (?, ?, ?, ?)",
+            (job_id, key, json.dumps(value, ensure_ascii=False), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def job_update(self, job_id, key, value):
+        """Set key only if the job exists (was not cleaned up). Returns True if this call set it."""
+        cursor = self.conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, key, value, updated) "
+            "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id = ?)",
+            (job_id, key, json.dumps(value, ensure_ascii=False), time.time(), job_id),
+        )
+        return cursor.rowcount == 1
+
+    def job_compare_and_set(self, job_id, key, expected, value):
+        """Set key only if its current value equals expected. Returns True if this call set it."""
+        cursor = self.conn().execute(
+            "UPDATE jobs SET value = ?, updated = ? WHERE job_id = ? AND key = ? AND value = ?",
+            (json.dumps(value, ensure_ascii=False), time.time(), job_id, key, json.dumps(expected, ensure_ascii=False)),
+        )
+        return cursor.rowcount == 1
+
+    def job_pop(self, job_id):
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            data = self.job_get_all(job_id)
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return data
+
+    def job_count(self):
+        return self.conn().execute("SELECT COUNT(DISTINCT job_id) FROM jobs").fetchone()[0]
+
+    def job_activity(self):
+        """Return {job_id: time of its last write} for every job."""
+        rows = self.conn().execute("SELECT job_id, MAX(updated) FROM jobs GROUP BY job_id").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def inflight_job_count(self, statuses, heartbeat_after):
+        """Count jobs preprocessing (status in statuses) or with a live, unfinished pipeline run."""
+        placeholders = ", ".join("?" * len(statuses))
+        return self.conn().execute(
+            "SELECT COUNT(DISTINCT job_id) FROM jobs "
+            f"WHERE (key = 'status' AND value IN ({placeholders})) "
+            "OR (key = 'pipeline_lease' AND json_extract(value, '$.heartbeat') > ? AND job_id NOT IN "
+            "(SELECT job_id FROM jobs WHERE key = 'pipeline_finished'))",
+            (*(json.dumps(status) for status in statuses), heartbeat_after),
+        ).fetchone()[0]
+
+    def events_append(self, job_id, data):
+        """Append a serialized event to the job's log; returns its event id."""
+        return self.conn().execute(
+            "INSERT INTO events (job_id, event_id, data) "
+            "SELECT ?, COALESCE(MAX(event_id), 0) + 1, ? FROM events WHERE job_id = ? RETURNING event_id",
+            (job_id, data, job_id),
+        ).fetchone()[0]
+
+    def events_since(self, job_id, after, timeout=0):
+        """Return [(event_id, data)] logged after event id `after`, polling up to timeout for one."""
+        deadline = time.time() + timeout
+        while True:
+            rows = self.conn().execute(
+                "SELECT event_id, data FROM events WHERE job_id = ? AND event_id > ? ORDER BY event_id",
+                (job_id, after),
+            ).fetchall()
+            if rows or time.time() >= deadline:
+                return [(row["event_id"], row["data"]) for row in rows]
+            time.sleep(EVENT_POLL_SECONDS)
+
+    def pow_spend(self, challenge, expires):
+        """Mark a challenge as spent. Returns False if it was already spent."""
+        cursor = self.conn().execute(
+            "INSERT OR IGNORE INTO pow_spent (challenge, bucket) VALUES (?, ?)",
+            (challenge, int(expires // POW_SPENT_BUCKET_SECONDS)),
+        )
+        return cursor.rowcount == 1
+
+    def pow_evict_spent(self, now):
+        self.conn().execute("DELETE FROM pow_spent WHERE bucket < ?", (int(now // POW_SPENT_BUCKET_SECONDS),))
+
+    def pow_spent_count(self):
+        return self.conn().execute("SELECT COUNT(*) FROM pow_spent").fetchone()[0]
+
+    def metrics_put(self, worker, snapshot):
+        self.conn().execute(
+            "INSERT OR REPLACE INTO metrics (worker, updated, data) VALUES (?, ?, ?)",
+            (worker, time.time(), json.dumps(snapshot)),
+        )
+
+    def metrics_all(self):
+        """Return {worker: (time published, snapshot)} for every worker that ever published."""
+        rows = self.conn().execute("SELECT worker, updated, data FROM metrics").fetchall()
+        return {row["worker"]: (row["updated"], json.loads(row["data"])) for row in rows}
+
+    def shared_secret(self):
+        # First worker to start wins; everyone else reads the same key
+        self.conn().execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('pow_secret', ?)", (secrets.token_hex(32),))
+        return self.conn().execute("SELECT value FROM meta WHERE key = 'pow_secret'").fetchone()[0]
+
+
+def make_store():
+    if STORE_BACKEND == "sqlite":
+        return SQLiteStore(STORE_PATH)
+    if STORE_BACKEND == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unknown STORE_BACKEND: {STORE_BACKEND}")
+
+
+store = make_store()
+pow_secret = (POW_SECRET or store.shared_secret()).encode("utf-8")
+
+# In-flight work in this process; drives the adaptive PoW difficulty
+inflight_lock = threading.Lock()
+inflight = {"preprocess": 0, "pipelines": 0, "streams": 0}
+
 
 # --- Helpers ---
 
 def generate_job_id():
     return str(uuid.uuid4())
 
-def generate_pow_id():
-    return str(uuid.uuid4())
-
 def generate_challenge():
     return secrets.token_hex(16)
 
+def sign_pow(*fields):
+    message = ".".join(str(f) for f in fields).encode("utf-8")
+    return hmac.new(pow_secret, message, hashlib.sha256).hexdigest()[:32]
+
+def issue_pow_token(challenge, difficulty, expires):
+    """Self-contained challenge token: challenge.difficulty.expires.signature"""
+    return f"{challenge}.{difficulty}.{expires}.{sign_pow('c', challenge, difficulty, expires)}"
+
+def issue_solved_token(challenge, expires):
+    """Token proving a solved challenge, usable for one upload until expires."""
+    return f"ok.{challenge}.{expires}.{sign_pow('ok', challenge, expires)}"
+
+def parse_pow_token(token, kind):
+    """Return the token's fields if its signature is valid and it is unexpired, else None."""
+    parts = (token or "").split(".")
+    try:
+        if kind == "challenge" and len(parts) == 4:
+            challenge, difficulty, expires, sig = parts[0], int(parts[1]), int(parts[2]), parts[3]
+            expected = sign_pow("c", challenge, difficulty, expires)
+            fields = (challenge, difficulty, expires)
+        elif kind == "solved" and len(parts) == 4 and parts[0] == "ok":
+            challenge, expires, sig = parts[1], int(parts[2]), parts[3]
+            expected = sign_pow("ok", challenge, expires)
+            fields = (challenge, expires)
+        else:
+            return None
+    except ValueError:
+        return None
+    if not hmac.compare_digest(sig, expected) or time.time() > expires:
+        return None
+    return fields
+
 def verify_pow(challenge, nonce, difficulty):
     hash_input = f"{challenge}{nonce}".encode("utf-8")
     hash_result = hashlib.sha256(hash_input).hexdigest()
     return hash_result.startswith("0" * difficulty)
 
-def cleanup_expired_pow():
-    current_time = time.time()
-    expired = [pid for pid, d in pow_store.items() if d["expires"] > 0 and d["expires"] < current_time]
-    for pid in expired:
-        del pow_store[pid]
+def track_inflight(kind, delta):
+    with inflight_lock:
+        inflight[kind] += delta
+
+pow_load = {"count": 0, "at": 0.0}
+pow_load_lock = threading.Lock()
+
+def current_pow_difficulty():
+    """POW_DIFFICULTY, raised by one level per POW_LOAD_STEP jobs in flight in any worker (capped).
+
+    Counting scans the job store, so each worker recounts at most every
+    POW_LOAD_REFRESH_SECONDS instead of on every /generate-pow.
+    """
+    with pow_load_lock:
+        now = time.time()
+        if now - pow_load["at"] >= POW_LOAD_REFRESH_SECONDS:
+            pow_load["count"] = store.inflight_job_count((JOB_QUEUED, JOB_CONVERTING), now - PIPELINE_LEASE_SECONDS)
+            pow_load["at"] = now
+        load = pow_load["count"]
+    return min(POW_MAX_DIFFICULTY, POW_DIFFICULTY + load // POW_LOAD_STEP)
+
+def consume_pow(pow_id):
+    """Use up a solved PoW token. Returns an error message, or None if valid."""
+    if not pow_id:
+        return "Proof-of-work validation required"
+    fields = parse_pow_token(pow_id, "solved")
+    if fields is None:
+        return "Invalid or expired PoW challenge"
+    challenge, expires = fields
+    store.pow_evict_spent(time.time())
+    if not store.pow_spend(challenge, expires):
+        return "PoW challenge already used"
+    return None
 
 def save_job_data(job_id, key, value):
-    job_store.setdefault(job_id, {})[key] = value
+    store.job_set(job_id, key, value)
+
+def update_job_data(job_id, key, value):
+    """Like save_job_data, but never recreates a job that was cleaned up meanwhile."""
+    return store.job_update(job_id, key, value)
 
 def get_job_data(job_id, key):
-    return job_store.get(job_id, {}).get(key)
+    return store.job_get(job_id, key)
 
-def cleanup_job(job_id):
-    data = job_store.pop(job_id, {})
-    for k in ["file_path", "converted_path", "compressed_path"]:
+def job_exists(job_id):
+    return store.job_exists(job_id)
+
+def remove_job_files(data):
+    for k in ["file_path", "converted_path", "compressed_path", "cached_path", "trimmed_path"]:
         p = data.get(k)
         if p and os.path.exists(p):
-            os.unlink(p)
+            try:
+                os.unlink(p)
+            except FileNotFoundError:
+                pass  # Removed concurrently (e.g. by another worker's janitor)
+
+def cleanup_job(job_id):
+    remove_job_files(store.job_pop(job_id))
 
 def allowed_file(filename, content_type=None):
     ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
@@ -105,24 +616,529 @@ def allowed_file(filename, content_type=None):
     mime, _ = mimetypes.guess_type(filename or "")
     return mime in SUPPORTED_MIMETYPES
 
+BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n")
+
 def remove_think_tags(text: str) -> str:
     if not text:
         return text
     cleaned = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
-    cleaned = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned)
+    cleaned = BLANK_LINES_RE.sub("\n\n", cleaned)
     return cleaned.strip()
 
+class ThinkTagFilter:
+    """Incremental remove_think_tags for streamed tokens.
+
+    Only a possible partial tag (< 8 chars) and the current whitespace run are
+    held back between tokens, so the work per token is proportional to its own
+    length. Joined output equals remove_think_tags of the joined input, except
+    that an unclosed <think> drops the rest of the stream instead of keeping it.
+    """
+
+    TAGS = {False: re.compile(r"<think>", re.IGNORECASE), True: re.compile(r"</think>", re.IGNORECASE)}
+
+    def __init__(self):
+        self.inside = False  # Within a <think> block
+        self.pending = ""  # Tail that may be the start of the next tag
+        self.space = ""  # Whitespace run held until we know whether text follows it
+        self.started = False  # Anything emitted yet (leading whitespace is stripped)
+
+    def feed(self, token):
+        text = self.pending + token
+        self.pending = ""
+        out = []
+        while text:
+            tag = self.TAGS[self.inside]
+            match = tag.search(text)
+            if match is None:
+                keep = self.partial_tag_length(text, tag.pattern)
+                if not self.inside:
+                    out.append(self.visible(text[:len(text) - keep]))
+                self.pending = text[len(text) - keep:]
+                break
+            if not self.inside:
+                out.append(self.visible(text[:match.start()]))
+            text = text[match.end():]
+            self.inside = not self.inside
+        return "".join(out)
+
+    def finish(self):
+        """Flush the held tail at the end of the stream; trailing whitespace is dropped."""
+        tail = "" if self.inside else self.visible(self.pending)
+        self.pending = self.space = ""
+        return tail
+
+    @staticmethod
+    def partial_tag_length(text, tag):
+        for k in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text[-k:].lower() == tag[:k]:
+                return k
+        return 0
+
+    def visible(self, text):
+        stripped = text.rstrip()
+        if not stripped:
+            self.space += text
+            return ""
+        chunk = self.space + stripped
+        self.space = text[len(stripped):]
+        if not self.started:
+            chunk = chunk.lstrip()
+            self.started = True
+        # chunk starts at a whitespace run and ends at non-whitespace, so every run in it is complete
+        return BLANK_LINES_RE.sub("\n\n", chunk)
+
+def strip_think_stream(tokens):
+    """Yield tokens with <think> blocks removed and blank lines collapsed, as they stream."""
+    think_filter = ThinkTagFilter()
+    for token in tokens:
+        text = think_filter.feed(token)
+        if text:
+            yield text
+    tail = think_filter.finish()
+    if tail:
+        yield tail
+
+
+# --- Metrics ---
+# Minimal Prometheus text-format registry. Histograms and counters are keyed by
+# metric name + label set and live in each process; every worker publishes a
+# snapshot to the store every METRICS_PUBLISH_SECONDS and /metrics sums them, so
+# any worker answers a scrape with the totals. Snapshots of workers that have
+# exited are kept, so counters never go backwards. Gauges are computed at scrape
+# time (per-process ones from the snapshots of live workers).
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+DURATION_BUCKETS = (30, 60, 300, 600, 1200, 1800, 3600, 5400, 7200)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 500)
+
+METRICS = {
+    "transcripator_stage_seconds": ("Wall time per pipeline stage", SECONDS_BUCKETS),
+    "transcripator_stage_bytes_in": ("Bytes consumed per pipeline stage", BYTES_BUCKETS),
+    "transcripator_stage_bytes_out": ("Bytes produced per pipeline stage", BYTES_BUCKETS),
+    "transcripator_audio_duration_seconds": ("Duration of processed audio", DURATION_BUCKETS),
+    "transcripator_llm_ttft_seconds": ("Time to first token of streamed LLM stages", SECONDS_BUCKETS),
+    "transcripator_llm_tokens_per_second": ("Token throughput of streamed LLM stages", RATE_BUCKETS),
+}
+
+metrics_lock = threading.Lock()
+histograms = {}  # (name, labels) -> {"buckets": [...], "sum": float, "count": int}
+counters = {}  # (name, labels) -> float
+metrics_publisher = {"pid": None, "worker": None}
+
+
+def metrics_worker():
+    """This process's name in the store's metrics table; starts its publisher on first use (after fork)."""
+    if metrics_publisher["pid"] != os.getpid():
+        with metrics_lock:
+            if metrics_publisher["pid"] != os.getpid():
+                metrics_publisher.update(pid=os.getpid(),
+                                         worker=f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}")
+                threading.Thread(target=metrics_publish_loop, name="metrics", daemon=True).start()
+    return metrics_publisher["worker"]
+
+
+def metrics_snapshot():
+    """JSON-friendly copy of this process's registry plus its process-local gauges."""
+    with metrics_lock:
+        snapshot = {
+            "histograms": [[name, labels, h] for (name, labels), h in histograms.items()],
+            "counters": [[name, labels, v] for (name, labels), v in counters.items()],
+        }
+        snapshot = json.loads(json.dumps(snapshot))  # Deep copy while locked
+    snapshot["gauges"] = local_gauges()
+    return snapshot
+
 
-def convert_to_supported_audio(file_path: str) -> str:
-    """Convert video/unsupported formats to ogg audio for Gemini."""
+def metrics_publish_loop():
+    while True:
+        time.sleep(METRICS_PUBLISH_SECONDS)
+        try:
+            store.metrics_put(metrics_worker(), metrics_snapshot())
+        except Exception as e:
+            app.logger.warning("Publishing metrics failed: %s", e)
+
+
+def merged_metrics():
+    """Sum every worker's histograms and counters (this one's live). Returns (histograms, counters, live snapshots)."""
+    now = time.time()
+    snapshots = store.metrics_all()
+    snapshots[metrics_worker()] = (now, metrics_snapshot())
+    merged_histograms, merged_counters, live = {}, {}, []
+    for updated, snapshot in snapshots.values():
+        for name, labels, h in snapshot["histograms"]:
+            merged = merged_histograms.setdefault(
+                (name, tuple(map(tuple, labels))), {"buckets": [0] * len(h["buckets"]), "sum": 0.0, "count": 0})
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], h["buckets"])]
+            merged["sum"] += h["sum"]
+            merged["count"] += h["count"]
+        for name, labels, v in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged_counters[key] = merged_counters.get(key, 0) + v
+        if now - updated <= 3 * METRICS_PUBLISH_SECONDS:
+            live.append(snapshot)
+    return merged_histograms, merged_counters, live
+
+
+def observe(name, value, **labels):
+    metrics_worker()
+    key = (name, tuple(sorted(labels.items())))
+    buckets = METRICS[name][1]
+    with metrics_lock:
+        h = histograms.setdefault(key, {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h["buckets"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+
+def inc_counter(name, amount=1, **labels):
+    metrics_worker()
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_lock:
+        counters[key] = counters.get(key, 0) + amount
+
+
+def file_size(path):
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+@contextmanager
+def timed_stage(stage):
+    start = time.time()
+    try:
+        yield
+    finally:
+        observe("transcripator_stage_seconds", time.time() - start, stage=stage)
+
+
+def instrument_stage(stage):
+    """Decorator recording the wall time of every call."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_file_stage(stage):
+    """Decorator for file -> file stages: records wall time and bytes in/out."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(file_path, *args, **kwargs):
+            with timed_stage(stage):
+                output_path = fn(file_path, *args, **kwargs)
+            observe("transcripator_stage_bytes_in", file_size(file_path), stage=stage)
+            observe("transcripator_stage_bytes_out", file_size(output_path), stage=stage)
+            return output_path
+        return wrapper
+    return decorator
+
+
+def measure_token_stream(stage, tokens, started):
+    """Pass tokens through, recording time-to-first-token (since started), tokens/s and wall time."""
+    first = None
+    count = 0
+    try:
+        for token in tokens:
+            if first is None:
+                first = time.time()
+                observe("transcripator_llm_ttft_seconds", first - started, stage=stage)
+            count += 1
+            yield token
+    finally:
+        end = time.time()
+        observe("transcripator_stage_seconds", end - started, stage=stage)
+        if first is not None and end > first:
+            observe("transcripator_llm_tokens_per_second", count / (end - first), stage=stage)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def render_metrics(merged_histograms, merged_counters, gauges):
+    lines = []
+    hist_items = sorted(merged_histograms.items())
+    counter_items = sorted(merged_counters.items())
+    for name, (help_text, buckets) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (metric, labels), h in hist_items:
+            if metric != name:
+                continue
+            for bound, n in zip(buckets, h["buckets"]):
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', f'{bound:g}'),))} {n}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {h['count']}")
+            lines.append(f"{name}_sum{format_labels(labels)} {h['sum']}")
+            lines.append(f"{name}_count{format_labels(labels)} {h['count']}")
+    for name in sorted({metric for (metric, _), _ in counter_items}):
+        lines += [f"# TYPE {name} counter"]
+        lines += [f"{name}{format_labels(labels)} {v}" for (metric, labels), v in counter_items if metric == name]
+    for name, help_text, samples in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{format_labels(labels)} {v}" for labels, v in samples]
+    return "\n".join(lines) + "\n"
+
+
+# --- Result cache ---
+# Layout: CACHE_FOLDER/<sha256>/{meta.json, audio.<ext>}. The mtime of meta.json
+# is bumped on every hit; entries unused for CACHE_TTL_SECONDS expire, and LRU
+# eviction runs once CACHE_MAX_BYTES is exceeded. The cache is off unless
+# CACHE_MAX_BYTES is set, and DELETE /cleanup/<job_id> purges the job's entry.
+
+cache_lock = threading.Lock()
+
+
+def save_upload_hashed(file, dest_path: str, max_size: int = MAX_FILE_SIZE):
+    """Copy an upload (FileStorage, request or file object) to dest_path in chunks, hashing as it goes.
+
+    Returns (sha256, size).
+    """
+    stream = getattr(file, "stream", file)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as out:
+            while True:
+                chunk = stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError("File too large. Maximum size is 100MB.")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        # Too large, or the client went away mid-upload: drop the partial file
+        if os.path.exists(dest_path):
+            os.unlink(dest_path)
+        raise
+    return digest.hexdigest(), size
+
+
+def cache_enabled():
+    return CACHE_MAX_BYTES > 0
+
+
+def _cache_dir(content_hash):
+    return os.path.join(CACHE_FOLDER, content_hash)
+
+
+def _read_cache_meta(content_hash):
+    """The entry's metadata, or None if it is missing or expired."""
+    path = os.path.join(_cache_dir(content_hash), "meta.json")
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL_SECONDS:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache_meta(content_hash, meta):
+    path = os.path.join(_cache_dir(content_hash), "meta.json")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def record_cache_lookup(hit, bytes_saved=0):
+    # Counters, so /cache/stats can sum them across workers like /metrics
+    inc_counter("transcripator_cache_lookups_total", result="hit" if hit else "miss")
+    inc_counter("transcripator_cache_bytes_saved_total", bytes_saved)
+
+
+def cache_get_audio(content_hash):
+    """Return the cached preprocessed audio path for content_hash, or None."""
+    if not cache_enabled() or not content_hash:
+        return None
+    meta = _read_cache_meta(content_hash)
+    if not meta or not meta.get("audio"):
+        return None
+    path = os.path.join(_cache_dir(content_hash), meta["audio"])
+    if not os.path.exists(path):
+        return None
+    os.utime(os.path.join(_cache_dir(content_hash), "meta.json"))
+    return path
+
+
+def cache_put_audio(content_hash, processed_path, upload_size, vad=None):
+    """Store preprocessed audio (and its silence-trimming info) under content_hash (no-op if already cached)."""
+    if not cache_enabled() or not content_hash:
+        return
+    entry_dir = _cache_dir(content_hash)
+    os.makedirs(entry_dir, exist_ok=True)
+    with cache_lock:
+        meta = _read_cache_meta(content_hash) or {}
+        if meta.get("audio") and os.path.exists(os.path.join(entry_dir, meta["audio"])):
+            return
+        audio_name = "audio" + os.path.splitext(processed_path)[1]
+        tmp = os.path.join(entry_dir, f"{audio_name}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(processed_path, tmp)
+        os.replace(tmp, os.path.join(entry_dir, audio_name))
+        meta.update({"audio": audio_name, "upload_size": upload_size, "vad": vad})
+        _write_cache_meta(content_hash, meta)
+    evict_cache()
+
+
+def cache_get_result(content_hash, key, source_text=None):
+    """Return a cached result text, or None.
+
+    If source_text is given, the hit only counts when the result was derived
+    from exactly that input (e.g. an unedited transcription).
+    """
+    if not cache_enabled() or not content_hash:
+        return None
+    meta = _read_cache_meta(content_hash)
+    entry = (meta or {}).get("results", {}).get(key)
+    if not entry or (source_text is not None and entry.get("source") != source_text):
+        return None
+    os.utime(os.path.join(_cache_dir(content_hash), "meta.json"))
+    return entry["text"]
+
+
+def cache_put_result(content_hash, key, text, source_text=None):
+    if not cache_enabled() or not content_hash or not text:
+        return
+    os.makedirs(_cache_dir(content_hash), exist_ok=True)
+    with cache_lock:
+        meta = _read_cache_meta(content_hash) or {}
+        meta.setdefault("results", {})[key] = {"text": text, "source": source_text}
+        _write_cache_meta(content_hash, meta)
+    evict_cache()
+
+
+def cache_usage():
+    """Return [(last_access, size, content_hash)] for every cache entry."""
+    entries = []
+    if not os.path.isdir(CACHE_FOLDER):
+        return entries
+    for name in os.listdir(CACHE_FOLDER):
+        entry_dir = os.path.join(CACHE_FOLDER, name)
+        try:
+            size = sum(e.stat().st_size for e in os.scandir(entry_dir) if e.is_file())
+            last_access = os.path.getmtime(os.path.join(entry_dir, "meta.json"))
+        except OSError:
+            continue
+        entries.append((last_access, size, name))
+    return entries
+
+
+def evict_cache():
+    """Drop expired entries, then least recently used ones until the cache fits into CACHE_MAX_BYTES."""
+    with cache_lock:
+        entries = sorted(cache_usage())
+        total = sum(size for _, size, _ in entries)
+        expired_before = time.time() - CACHE_TTL_SECONDS
+        for last_access, size, name in entries:
+            if total <= CACHE_MAX_BYTES and last_access >= expired_before:
+                break
+            shutil.rmtree(_cache_dir(name), ignore_errors=True)
+            total -= size
+
+
+def cache_purge(content_hash):
+    """Remove everything cached for content_hash (audio and results)."""
+    if content_hash:
+        with cache_lock:
+            shutil.rmtree(_cache_dir(content_hash), ignore_errors=True)
+
+
+def save_result(job_id, key, text, source_text=None):
+    """Save a pipeline result on the job and in the content cache."""
+    save_job_data(job_id, key, text)
+    cache_put_result(get_job_data(job_id, "content_hash"), key, text, source_text)
+
+
+def get_cached_result(job_id, key, source_text=None):
+    """Look up a pipeline result for a job in the content cache and update hit stats."""
+    content_hash = get_job_data(job_id, "content_hash")
+    if not cache_enabled() or not content_hash:
+        return None
+    text = cache_get_result(content_hash, key, source_text)
+    saved = len((source_text or "").encode("utf-8")) if text else 0
+    if text and key == "original_transcription":
+        path = get_job_data(job_id, "processed_file_path")
+        saved = os.path.getsize(path) if path and os.path.exists(path) else 0
+    record_cache_lookup(text is not None, saved)
+    return text
+
+
+def get_audio_duration(file_path: str) -> float:
+    """Return the duration of a media file in seconds (via ffprobe)."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
+            capture_output=True, text=True, timeout=30,
+        )
+        return float(result.stdout.strip())
+    except Exception as e:
+        raise ValueError(f"Failed to get audio duration: {e}")
+
+
+# --- Media pipeline ---
+
+def probe_media(file_path: str) -> dict:
+    """Probe a media file once and return duration, codec, channels, sample rate and size."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams",
+             "-select_streams", "a:0", file_path],
+            capture_output=True, text=True, timeout=30, check=True,
+        )
+        info = json.loads(result.stdout)
+    except Exception as e:
+        raise ValueError(f"Failed to probe media: {e}")
+    streams = info.get("streams") or []
+    if not streams:
+        raise ValueError("No audio stream found in file")
+    stream = streams[0]
+    fmt = info.get("format", {})
+    duration = fmt.get("duration") or stream.get("duration")
+    if duration is None:
+        raise ValueError("Failed to get audio duration")
+    return {
+        "duration": float(duration),
+        "codec": stream.get("codec_name"),
+        "channels": int(stream.get("channels") or 0),
+        "sample_rate": int(stream.get("sample_rate") or 0),
+        "format": fmt.get("format_name"),
+        "size": os.path.getsize(file_path),
+    }
+
+
+def speech_bitrate_kbps(duration: float, max_size: int = GROQ_MAX_FILE_SIZE) -> int:
+    """Highest Opus bitrate (within speech bounds) that keeps duration under max_size."""
+    budget_kbps = int((max_size * 8 * SPEECH_SIZE_HEADROOM) / max(duration, 1.0)) // 1000
+    return max(SPEECH_MIN_KBPS, min(SPEECH_MAX_KBPS, budget_kbps))
+
+
+@instrument_file_stage("transcode")
+def prepare_media(file_path: str, media_info: dict = None) -> str:
+    """Produce provider-ready audio for file_path in at most one ffmpeg run.
+
+    Small files in a provider-supported audio format are passed through. Everything
+    else (video, unsupported codecs, oversize files) is transcoded once to mono
+    16 kHz Opus sized to fit under GROQ_MAX_FILE_SIZE.
+    """
+    media_info = media_info or probe_media(file_path)
     ext = os.path.splitext(file_path)[1].lower().lstrip(".")
-    if ext in AUDIO_FORMAT_MAP:
+    if ext in AUDIO_FORMAT_MAP and media_info["size"] <= GROQ_MAX_FILE_SIZE:
         return file_path
-    # Convert to ogg opus
-    output_path = os.path.splitext(file_path)[0] + ".ogg"
+    kbps = speech_bitrate_kbps(media_info["duration"])
+    output_path = os.path.splitext(file_path)[0] + "_speech.ogg"
     try:
         subprocess.run(
-            ["ffmpeg", "-i", file_path, "-vn", "-c:a", "libopus", "-b:a", "64k", "-y", output_path],
+            ["ffmpeg", "-i", file_path, "-vn", "-sn", "-dn", "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE),
+             "-c:a", "libopus", "-b:a", f"{kbps}k", "-application", "voip", "-y", output_path],
             capture_output=True, text=True, timeout=300, check=True,
         )
         return output_path
@@ -130,44 +1146,195 @@ def convert_to_supported_audio(file_path: str) -> str:
         raise ValueError(f"FFmpeg conversion failed: {e.stderr}")
 
 
-def compress_audio(file_path: str, max_size: int = 24 * 1024 * 1024) -> str:
-    """Compress audio to under max_size."""
-    if os.path.getsize(file_path) <= max_size:
-        return file_path
+# --- Silence trimming (VAD) ---
+# With VAD_TRIM on, silences longer than VAD_MIN_SILENCE_SECONDS (hold music
+# usually sits below VAD_NOISE_DB too) are cut from the provider audio right
+# after transcoding. The job keeps an offset map of [trimmed_start,
+# original_start, length] segments so times in the trimmed audio can be mapped
+# back to the recording with trimmed_to_original().
+
+def speech_segments(duration: float, silences: list) -> list:
+    """(start, end) ranges of [0, duration] to keep: everything but the silences, minus padding."""
+    segments, pos = [], 0.0
+    for start, end in silences:
+        cut_start, cut_end = start + VAD_PADDING_SECONDS, end - VAD_PADDING_SECONDS
+        if cut_end <= cut_start:
+            continue
+        if cut_start > pos:
+            segments.append((pos, cut_start))
+        pos = max(pos, cut_end)
+    if pos < duration:
+        segments.append((pos, duration))
+    return segments
+
+
+def trimmed_to_original(t: float, offsets: list) -> float:
+    """Map a time in the trimmed audio to the original recording."""
+    for trimmed_start, original_start, length in offsets:
+        if t < trimmed_start + length:
+            return original_start + max(0.0, t - trimmed_start)
+    return offsets[-1][1] + offsets[-1][2] if offsets else t
+
+
+def trim_silence(file_path: str, duration: float):
+    """Cut long silences in one ffmpeg pass. Returns (output_path, vad_info), or None if not worth it."""
+    silences = detect_silences(file_path, VAD_NOISE_DB, VAD_MIN_SILENCE_SECONDS, until=duration)
+    segments = speech_segments(duration, silences)
+    kept = sum(end - start for start, end in segments)
+    if not segments or duration - kept < VAD_MIN_SAVING_SECONDS:
+        return None
+
+    offsets, position = [], 0.0
+    for start, end in segments:
+        offsets.append([round(position, 3), round(start, 3), round(end - start, 3)])
+        position += end - start
+    select = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in segments)
+    output_path = os.path.splitext(file_path)[0] + "_voiced.ogg"
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
-            capture_output=True, text=True, timeout=30,
+        subprocess.run(
+            ["ffmpeg", "-i", file_path, "-vn", "-af", f"aselect='{select}',asetpts=N/SR/TB",
+             "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE), "-c:a", "libopus",
+             "-b:a", f"{speech_bitrate_kbps(kept)}k", "-application", "voip", "-y", output_path],
+            capture_output=True, text=True, timeout=300, check=True,
         )
-        duration = float(result.stdout.strip())
-    except Exception as e:
-        raise ValueError(f"Failed to get audio duration: {e}")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"FFmpeg silence trimming failed: {e.stderr}")
+    return output_path, {
+        "seconds_removed": round(duration - kept, 3),
+        "bytes_removed": os.path.getsize(file_path) - os.path.getsize(output_path),
+        "original_duration": duration,
+        "offsets": offsets,
+    }
 
-    target_kbps = max(16, min(128, int((max_size * 8) / duration) // 1000))
-    output_path = os.path.splitext(file_path)[0] + "_compressed.ogg"
-    subprocess.run(
-        ["ffmpeg", "-i", file_path, "-vn", "-c:a", "libopus", "-b:a", f"{target_kbps}k", "-y", output_path],
-        capture_output=True, text=True, timeout=300, check=True,
-    )
+
+def apply_vad(job_id, file_path, media_info):
+    """Trim the job's provider audio if VAD_TRIM is on; returns the path to transcribe."""
+    if not VAD_TRIM or not media_info.get("duration"):
+        return file_path
+    with timed_stage("vad"):
+        trimmed = trim_silence(file_path, media_info["duration"])
+    if trimmed is None:
+        return file_path
+    output_path, vad = trimmed
+    inc_counter("transcripator_vad_removed_seconds_total", vad["seconds_removed"])
+    inc_counter("transcripator_vad_removed_bytes_total", vad["bytes_removed"])
+    update_job_data(job_id, "trimmed_path", output_path)
+    update_job_data(job_id, "vad", vad)
+    update_job_data(job_id, "media_info", dict(media_info, duration=media_info["duration"] - vad["seconds_removed"],
+                                             size=os.path.getsize(output_path)))
     return output_path
 
 
+# --- Provider HTTP clients ---
+# One pooled keep-alive session per provider, so consecutive pipeline stages
+# reuse warm TCP/TLS connections. A semaphore caps in-flight requests per
+# provider; 429/5xx and connection errors are retried with exponential backoff
+# that honors Retry-After.
+
+def make_provider_client(max_concurrency):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return {"session": session, "semaphore": threading.BoundedSemaphore(max_concurrency)}
+
+
+provider_clients = {
+    "openrouter": make_provider_client(OPENROUTER_MAX_CONCURRENCY),
+    "groq": make_provider_client(GROQ_MAX_CONCURRENCY),
+}
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (delta-seconds or HTTP date), or return None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, response=None):
+    retry_after = retry_after_seconds(response) if response is not None else None
+    if retry_after is not None:
+        return min(retry_after, PROVIDER_BACKOFF_MAX)
+    delay = PROVIDER_BACKOFF_BASE * (2 ** attempt)
+    return min(delay + random.uniform(0, delay / 2), PROVIDER_BACKOFF_MAX)
+
+
+class RequestCancelled(Exception):
+    """The caller's cancel event was set, e.g. the other side of a hedged request won."""
+
+
+def pause(seconds, cancel=None):
+    if cancel is None:
+        time.sleep(seconds)
+    else:
+        cancel.wait(seconds)
+
+
+def provider_post(provider, url, timeout, stream=False, cancel=None, **kwargs):
+    """POST to a provider through its pooled session with retries.
+
+    timeout is the read timeout for this call. For streamed responses the
+    concurrency slot is held until the response is closed. Once the optional
+    cancel event is set, no further attempt is started (one already in flight
+    runs to completion).
+    """
+    client = provider_clients[provider]
+    for attempt in range(PROVIDER_MAX_RETRIES + 1):
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled(f"{provider} request cancelled")
+        client["semaphore"].acquire()
+        try:
+            response = client["session"].post(
+                url, timeout=(PROVIDER_CONNECT_TIMEOUT, timeout), stream=stream, **kwargs,
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            inc_counter("transcripator_upstream_responses_total", provider=provider, status="error")
+            client["semaphore"].release()
+            if attempt == PROVIDER_MAX_RETRIES:
+                raise
+            pause(backoff_delay(attempt), cancel)
+            continue
+
+        inc_counter("transcripator_upstream_responses_total", provider=provider, status=str(response.status_code))
+        if response.status_code in RETRY_STATUS_CODES and attempt < PROVIDER_MAX_RETRIES:
+            delay = backoff_delay(attempt, response)
+            response.close()
+            client["semaphore"].release()
+            pause(delay, cancel)
+            continue
+
+        if stream and response.status_code == 200:
+            release = threading.Event()
+            close = response.close
+
+            def close_and_release():
+                close()
+                if not release.is_set():
+                    release.set()
+                    client["semaphore"].release()
+
+            response.close = close_and_release
+        else:
+            client["semaphore"].release()
+        return response
+
+
 # --- Groq Whisper transcription ---
 
 def compress_audio_for_groq(file_path: str) -> str:
     """Compress audio to under 24MB for Groq Whisper API."""
     if os.path.getsize(file_path) <= GROQ_MAX_FILE_SIZE:
         return file_path
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
-            capture_output=True, text=True, timeout=30,
-        )
-        duration = float(result.stdout.strip())
-    except Exception as e:
-        raise ValueError(f"Failed to get audio duration: {e}")
+    duration = get_audio_duration(file_path)
     target_kbps = max(16, min(128, int((GROQ_MAX_FILE_SIZE * 8) / duration) // 1000))
     output_path = os.path.splitext(file_path)[0] + "_groq.ogg"
     subprocess.run(
@@ -177,28 +1344,190 @@ def compress_audio_for_groq(file_path: str) -> str:
     return output_path
 
 
-def transcribe_with_groq(file_path: str) -> str:
-    """Transcribe audio using Groq Whisper large-v3."""
-    compressed = compress_audio_for_groq(file_path)
+def groq_transcribe_file(file_path: str, cancel=None) -> str:
+    """Send a single audio file (<= 24MB) to Groq Whisper large-v3."""
     headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
-    with open(compressed, "rb") as f:
-        files = {"file": (os.path.basename(compressed), f, "application/octet-stream")}
-        data = {"model": "whisper-large-v3", "response_format": "text", "temperature": 0.0}
-        response = requests.post(GROQ_API_URL, headers=headers, files=files, data=data, timeout=120)
-    if compressed != file_path and os.path.exists(compressed):
-        os.unlink(compressed)
+    with open(file_path, "rb") as f:
+        # Read into memory so the body can be resent on retry
+        files = {"file": (os.path.basename(file_path), f.read(), "application/octet-stream")}
+    data = {"model": "whisper-large-v3", "response_format": "text", "temperature": 0.0}
+    response = provider_post("groq", GROQ_API_URL, timeout=120, cancel=cancel, headers=headers, files=files, data=data)
     if response.status_code != 200:
         raise Exception(f"Groq Whisper failed ({response.status_code}): {response.text}")
     return response.text.strip()
 
 
-# --- Gemini API calls via OpenRouter ---
+def detect_silences(file_path: str, noise_db: float = SILENCE_NOISE_DB, min_seconds: float = SILENCE_MIN_SECONDS,
+                    until: float = None) -> list:
+    """Return (start, end) silence intervals using ffmpeg's silencedetect filter.
+
+    A silence still open at the end of the file is only reported if until (the
+    duration) is given.
+    """
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", file_path, "-vn",
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_seconds}",
+         "-f", "null", "-"],
+        capture_output=True, text=True, timeout=300,
+    )
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        m = re.search(r"silence_start: (-?[\d.]+)", line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = re.search(r"silence_end: ([\d.]+)", line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    if start is not None and until is not None and until > start:
+        silences.append((start, until))
+    return silences
+
+
+def plan_chunks(duration: float, silences: list) -> list:
+    """Split [0, duration] into (start, end) chunks, cutting in the middle of silences.
+
+    Each chunk aims for GROQ_CHUNK_SECONDS and never exceeds GROQ_CHUNK_MAX_SECONDS.
+    """
+    cut_points = sorted((s + e) / 2 for s, e in silences)
+    chunks = []
+    start = 0.0
+    while duration - start > GROQ_CHUNK_MAX_SECONDS:
+        lo = start + GROQ_CHUNK_SECONDS / 2
+        hi = start + GROQ_CHUNK_MAX_SECONDS
+        target = start + GROQ_CHUNK_SECONDS
+        candidates = [c for c in cut_points if lo <= c <= hi]
+        end = min(candidates, key=lambda c: abs(c - target)) if candidates else hi
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def extract_audio_chunk(file_path: str, start: float, end: float, output_path: str) -> str:
+    """Cut [start, end) out of file_path as speech-optimized mono 16 kHz Opus."""
+    try:
+        subprocess.run(
+            ["ffmpeg", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", file_path,
+             "-vn", "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE), "-c:a", "libopus", "-b:a", GROQ_CHUNK_BITRATE,
+             "-y", output_path],
+            capture_output=True, text=True, timeout=300, check=True,
+        )
+        return output_path
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"FFmpeg chunk extraction failed: {e.stderr}")
+
+
+def transcribe_chunk_with_retry(file_path: str, start: float, end: float, output_path: str, cancel=None) -> str:
+    """Extract and transcribe one chunk, retrying only this chunk on failure."""
+    last_error = None
+    try:
+        for attempt in range(GROQ_CHUNK_RETRIES):
+            try:
+                if not os.path.exists(output_path):
+                    extract_audio_chunk(file_path, start, end, output_path)
+                return groq_transcribe_file(output_path, cancel)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                last_error = e
+                if attempt < GROQ_CHUNK_RETRIES - 1:
+                    pause(2 ** attempt, cancel)
+        raise Exception(f"Chunk {start:.0f}s-{end:.0f}s failed after {GROQ_CHUNK_RETRIES} attempts: {last_error}")
+    finally:
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+
+
+def transcribe_with_groq_chunked(file_path: str, duration: float, cancel=None) -> str:
+    """Transcribe a long recording as silence-aligned chunks in parallel, stitched in order.
+
+    If a chunk fails for good, cancel is set and queued chunks are dropped, so the
+    others stop retrying for a transcription that has already failed.
+    """
+    chunks = plan_chunks(duration, detect_silences(file_path))
+    base = os.path.splitext(file_path)[0]
+    cancel = cancel or threading.Event()
+    with ThreadPoolExecutor(max_workers=GROQ_CHUNK_WORKERS) as pool:
+        futures = [
+            pool.submit(transcribe_chunk_with_retry, file_path, start, end, f"{base}_chunk{i:03d}.ogg", cancel)
+            for i, (start, end) in enumerate(chunks)
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = next((f for f in futures if f in done and f.exception() is not None), None)
+        if failed is not None:
+            cancel.set()
+            pool.shutdown(wait=True, cancel_futures=True)  # Running chunks return at their next cancel check
+            raise failed.exception()
+        texts = [f.result() for f in futures]
+    return " ".join(t for t in texts if t)
+
+
+def transcribe_with_groq(file_path: str, duration: float = None, cancel=None) -> str:
+    """Transcribe audio using Groq Whisper large-v3.
+
+    Recordings longer than GROQ_CHUNK_MAX_SECONDS are split at silences and
+    transcribed chunk by chunk in parallel. Pass duration if it is already known
+    to skip the ffprobe run.
+    """
+    if duration is None:
+        duration = get_audio_duration(file_path)
+    observe("transcripator_audio_duration_seconds", duration, stage="transcribe_groq")
+    observe("transcripator_stage_bytes_in", file_size(file_path), stage="transcribe_groq")
+    with timed_stage("transcribe_groq"):
+        if duration > GROQ_CHUNK_MAX_SECONDS:
+            text = transcribe_with_groq_chunked(file_path, duration, cancel)
+        else:
+            compressed = compress_audio_for_groq(file_path)
+            try:
+                text = groq_transcribe_file(compressed, cancel)
+            finally:
+                if compressed != file_path and os.path.exists(compressed):
+                    os.unlink(compressed)
+    observe("transcripator_stage_bytes_out", len(text.encode("utf-8")), stage="transcribe_groq")
+    return text
 
-def call_gemini_with_audio(file_path: str, prompt: str) -> str:
-    """Send audio directly to Gemini Flash Lite via OpenRouter."""
-    with open(file_path, "rb") as f:
-        audio_b64 = base64.b64encode(f.read()).decode("utf-8")
 
+# --- Gemini API calls via OpenRouter ---
+
+class AudioJSONBody:
+    """Streaming JSON request body that base64-encodes an audio file from disk.
+
+    The payload is serialized once with a placeholder for the audio data; the
+    audio is then read and encoded in fixed-size chunks while requests writes
+    the body to the socket, so no full base64 copy of the file is ever held in
+    memory. __len__ lets requests send a Content-Length instead of chunking,
+    and every iteration starts from the beginning, so retries can resend it.
+    """
+
+    PLACEHOLDER = "__AUDIO_DATA__"
+    CHUNK_SIZE = 3 * 64 * 1024  # Multiple of 3, so chunks encode without padding
+
+    def __init__(self, file_path: str, payload: dict):
+        self.file_path = file_path
+        prefix, suffix = json.dumps(payload, ensure_ascii=False).split(f'"{self.PLACEHOLDER}"', 1)
+        self.prefix = (prefix + '"').encode("utf-8")
+        self.suffix = ('"' + suffix).encode("utf-8")
+        self.audio_size = os.path.getsize(file_path)
+
+    def __len__(self):
+        return len(self.prefix) + 4 * ((self.audio_size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.file_path, "rb") as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield self.suffix
+
+
+def build_audio_request(file_path: str, prompt: str, stream: bool = False):
+    """Return (headers, body) for an OpenRouter chat request with inline audio."""
     ext = os.path.splitext(file_path)[1].lower().lstrip(".")
     audio_format = AUDIO_FORMAT_MAP.get(ext, "ogg")
 
@@ -212,13 +1541,21 @@ def call_gemini_with_audio(file_path: str, prompt: str) -> str:
             {
                 "role": "user",
                 "content": [
-                    {"type": "input_audio", "input_audio": {"data": audio_b64, "format": audio_format}},
+                    {"type": "input_audio", "input_audio": {"data": AudioJSONBody.PLACEHOLDER, "format": audio_format}},
                     {"type": "text", "text": prompt},
                 ],
             }
         ],
     }
-    response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=120)
+    if stream:
+        payload["stream"] = True
+    return headers, AudioJSONBody(file_path, payload)
+
+
+def call_gemini_with_audio(file_path: str, prompt: str, cancel=None) -> str:
+    """Send audio directly to Gemini Flash Lite via OpenRouter."""
+    headers, body = build_audio_request(file_path, prompt)
+    response = provider_post("openrouter", OPENROUTER_API_URL, timeout=120, cancel=cancel, headers=headers, data=body)
     if response.status_code != 200:
         raise Exception(f"OpenRouter API failed ({response.status_code}): {response.text}")
     return remove_think_tags(response.json()["choices"][0]["message"]["content"])
@@ -237,12 +1574,424 @@ def call_gemini_text(system_prompt: str, user_prompt: str) -> str:
             {"role": "user", "content": user_prompt},
         ],
     }
-    response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=60)
+    response = provider_post("openrouter", OPENROUTER_API_URL, timeout=60, headers=headers, json=payload)
     if response.status_code != 200:
         raise Exception(f"OpenRouter API failed ({response.status_code}): {response.text}")
     return remove_think_tags(response.json()["choices"][0]["message"]["content"])
 
 
+# --- Hedged transcription ---
+# Groq is the primary transcriber and Gemini audio the secondary. In "failover"
+# mode Gemini only runs if Groq fails. In "hedge" mode Gemini also starts when
+# Groq has not answered within its recent p95 latency (scaled to the audio
+# duration). The first good result wins and the other request is cancelled:
+# it starts no further attempts or chunks, and its result is discarded.
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe this audio accurately. Return ONLY the transcription text, nothing else. "
+    "Use the same language as the audio."
+)
+
+hedge_executor = ThreadPoolExecutor(max_workers=2 * (PIPELINE_WORKERS + BATCH_WORKERS), thread_name_prefix="hedge")
+groq_latency_lock = threading.Lock()
+groq_latency_ratios = deque(maxlen=HEDGE_WINDOW)  # Groq seconds per second of audio
+
+
+def groq_p95_ratio():
+    with groq_latency_lock:
+        samples = sorted(groq_latency_ratios)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[int(0.95 * (len(samples) - 1))]
+
+
+def hedge_delay(duration):
+    ratio = groq_p95_ratio()
+    if ratio is None or not duration:
+        return HEDGE_INITIAL_DELAY_SECONDS
+    return max(HEDGE_MIN_DELAY_SECONDS, ratio * duration)
+
+
+def timed_groq_transcribe(file_path, duration, cancel):
+    started = time.time()
+    text = transcribe_with_groq(file_path, duration, cancel)
+    if duration:
+        with groq_latency_lock:
+            groq_latency_ratios.append((time.time() - started) / duration)
+    return text
+
+
+def transcribe_audio(file_path: str, duration: float = None) -> str:
+    """Transcribe with Groq, failing over to (or hedging with) Gemini audio per TRANSCRIBE_HEDGE."""
+    if TRANSCRIBE_HEDGE == "off":
+        return transcribe_with_groq(file_path, duration)
+    if duration is None:
+        duration = get_audio_duration(file_path)
+
+    inc_counter("transcripator_transcriptions_total")
+    cancels = {"groq": threading.Event(), "gemini": threading.Event()}
+    futures = {hedge_executor.submit(timed_groq_transcribe, file_path, duration, cancels["groq"]): "groq"}
+    delay = hedge_delay(duration) if TRANSCRIBE_HEDGE == "hedge" else None
+    done, _ = wait(futures, timeout=delay)
+    if done and next(iter(done)).exception() is None:
+        inc_counter("transcripator_transcription_wins_total", provider="groq")
+        return next(iter(done)).result()
+
+    inc_counter("transcripator_transcription_hedges_total", reason="error" if done else "slow")
+    gemini = hedge_executor.submit(call_gemini_with_audio, file_path, TRANSCRIBE_PROMPT, cancels["gemini"])
+    futures[gemini] = "gemini"
+    errors, pending = [], set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = futures[future]
+            if future.exception() is not None:
+                errors.append(f"{provider}: {future.exception()}")
+                continue
+            for other in futures.values():
+                if other != provider:
+                    cancels[other].set()
+            inc_counter("transcripator_transcription_wins_total", provider=provider)
+            return future.result()
+    raise Exception(f"Transcription failed ({'; '.join(errors)})")
+
+
+# --- Background preprocessing ---
+# Uploads return immediately; ffmpeg runs on a bounded pool so slow transcodes
+# never hold a request thread. Job status: queued -> converting -> ready | failed
+# (chunked uploads start as uploading until they are finalized).
+
+JOB_UPLOADING = "uploading"
+JOB_QUEUED = "queued"
+JOB_CONVERTING = "converting"
+JOB_READY = "ready"
+JOB_FAILED = "failed"
+
+preprocess_executor = ThreadPoolExecutor(max_workers=FFMPEG_WORKERS, thread_name_prefix="ffmpeg")
+# Streaming ingest runs ffmpeg in the request, outside the pool: these slots keep
+# those transcodes within FFMPEG_WORKERS too (uploads beyond it are spooled to disk)
+streaming_transcodes = threading.BoundedSemaphore(FFMPEG_WORKERS)
+
+
+def submit_preprocess(fn, *args):
+    """Queue fn on the ffmpeg pool, counting it as in-flight work until it finishes."""
+    def run():
+        try:
+            fn(*args)
+        finally:
+            track_inflight("preprocess", -1)
+
+    track_inflight("preprocess", 1)
+    preprocess_executor.submit(run)
+
+
+def preprocess_job(job_id, upload_size):
+    """Probe and transcode an uploaded file, updating the job status as it goes."""
+    if not store.job_compare_and_set(job_id, "status", JOB_QUEUED, JOB_CONVERTING):
+        return  # Cleaned up, or failed by a reader's timeout, while queued
+    original_file_path = get_job_data(job_id, "file_path")
+    outputs = {}
+    try:
+        # Probe once, then convert/compress in a single ffmpeg pass if needed
+        media_info = probe_media(original_file_path)
+        update_job_data(job_id, "media_info", media_info)
+        observe("transcripator_audio_duration_seconds", media_info["duration"], stage="upload")
+        processed_file_path = prepare_media(original_file_path, media_info)
+        if processed_file_path != original_file_path:
+            outputs["converted_path"] = processed_file_path
+            update_job_data(job_id, "converted_path", processed_file_path)
+        trimmed_path = apply_vad(job_id, processed_file_path, media_info)
+        if trimmed_path != processed_file_path:
+            processed_file_path = outputs["trimmed_path"] = trimmed_path
+
+        update_job_data(job_id, "processed_file_path", processed_file_path)
+        cache_put_audio(get_job_data(job_id, "content_hash"), processed_file_path, upload_size,
+                        get_job_data(job_id, "vad"))
+    except Exception as e:
+        fail_preprocessing(job_id, str(e), outputs)
+        return
+    finish_preprocessing(job_id, outputs)
+
+
+def fail_preprocessing(job_id, error, outputs):
+    """Mark a converting job failed; keep its entry so clients can read why, but drop its files."""
+    update_job_data(job_id, "error", error)
+    store.job_compare_and_set(job_id, "status", JOB_CONVERTING, JOB_FAILED)
+    remove_job_files(dict(store.job_get_all(job_id), **outputs))
+
+
+def finish_preprocessing(job_id, outputs):
+    """Mark a converting job ready, unless it was failed or cleaned up meanwhile."""
+    if not store.job_compare_and_set(job_id, "status", JOB_CONVERTING, JOB_READY):
+        # A reader timed it out or it was deleted: nothing will use (or clean up) these files
+        remove_job_files(dict(store.job_get_all(job_id), **outputs))
+
+
+def use_cached_audio(job_id, cached_audio, upload_size):
+    """Point a job at a hard link (or copy) of cached preprocessed audio and mark it ready."""
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    cached_path = os.path.join(upload_dir, f"{job_id}_cached{os.path.splitext(cached_audio)[1]}")
+    try:
+        os.link(cached_audio, cached_path)
+    except OSError:
+        shutil.copyfile(cached_audio, cached_path)
+    save_job_data(job_id, "cached_path", cached_path)
+    save_job_data(job_id, "processed_file_path", cached_path)
+    vad = (_read_cache_meta(get_job_data(job_id, "content_hash")) or {}).get("vad")
+    if vad:
+        save_job_data(job_id, "vad", vad)
+    save_job_data(job_id, "status", JOB_READY)
+    record_cache_lookup(True, upload_size)
+
+
+def start_preprocessing(job_id, content_hash, upload_size):
+    """Reuse cached audio for known uploads, otherwise queue the job for ffmpeg."""
+    cached_audio = cache_get_audio(content_hash)
+    if cached_audio:
+        # Same bytes were preprocessed before: reuse the cached audio, skip ffmpeg
+        use_cached_audio(job_id, cached_audio, upload_size)
+        return
+    if cache_enabled():
+        record_cache_lookup(False)
+    save_job_data(job_id, "status", JOB_QUEUED)
+    submit_preprocess(preprocess_job, job_id, upload_size)
+
+
+def create_upload_job(file, filename, stage):
+    """Save an upload under a new job and queue it for preprocessing. Raises ValueError if it is too large."""
+    job_id = generate_job_id()
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_dir, exist_ok=True)
+
+    original_file_path = os.path.join(upload_dir, f"{job_id}_{filename}")
+    content_hash, file_size = save_upload_hashed(file, original_file_path)
+    observe("transcripator_stage_bytes_in", file_size, stage=stage)
+
+    save_job_data(job_id, "original_filename", filename)
+    save_job_data(job_id, "file_path", original_file_path)
+    save_job_data(job_id, "content_hash", content_hash)
+
+    start_preprocessing(job_id, content_hash, file_size)
+    return job_id
+
+
+def pipe_upload_to_ffmpeg(stream, output_path, max_size=MAX_FILE_SIZE):
+    """Feed an upload stream into ffmpeg's stdin as it arrives, hashing on the way.
+
+    ffmpeg transcodes to speech-optimized Opus while the client is still
+    uploading, and the original is never written to disk. Returns
+    (process, stderr_file, sha256, size); the caller waits for the process.
+    """
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", "pipe:0", "-vn", "-sn", "-dn", "-ac", "1",
+         "-ar", str(SPEECH_SAMPLE_RATE), "-c:a", "libopus", "-b:a", f"{SPEECH_MAX_KBPS}k",
+         "-application", "voip", "-y", output_path],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file,
+    )
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(256 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise ValueError("File too large. Maximum size is 100MB.")
+            digest.update(chunk)
+            try:
+                proc.stdin.write(chunk)
+            except BrokenPipeError:
+                # ffmpeg gave up on the input; the exit status carries the error
+                break
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass  # Same as above
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        stderr_file.close()
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+    return proc, stderr_file, digest.hexdigest(), size
+
+
+def finish_streamed_job(job_id, proc, stderr_file, upload_size):
+    """Wait for a streaming ffmpeg transcode and mark the job ready or failed."""
+    output_path = get_job_data(job_id, "converted_path")
+    outputs = {"converted_path": output_path}
+    try:
+        try:
+            returncode = proc.wait(timeout=300)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise ValueError("FFmpeg conversion timed out")
+        finally:
+            streaming_transcodes.release()
+        if returncode != 0:
+            stderr_file.seek(0)
+            raise ValueError(f"FFmpeg conversion failed: {stderr_file.read().decode('utf-8', 'replace')}")
+        media_info = probe_media(output_path)
+        update_job_data(job_id, "media_info", media_info)
+        processed_file_path = output_path
+        if media_info["size"] > GROQ_MAX_FILE_SIZE:
+            # Very long recordings: one more pass at a bitrate that fits the provider limit
+            processed_file_path = outputs["compressed_path"] = prepare_media(output_path, media_info)
+            update_job_data(job_id, "compressed_path", processed_file_path)
+        trimmed_path = apply_vad(job_id, processed_file_path, media_info)
+        if trimmed_path != processed_file_path:
+            processed_file_path = outputs["trimmed_path"] = trimmed_path
+        update_job_data(job_id, "processed_file_path", processed_file_path)
+        cache_put_audio(get_job_data(job_id, "content_hash"), processed_file_path, upload_size,
+                        get_job_data(job_id, "vad"))
+    except Exception as e:
+        fail_preprocessing(job_id, str(e), outputs)
+        return
+    finally:
+        stderr_file.close()
+    finish_preprocessing(job_id, outputs)
+
+
+def wait_for_job_ready(job_id):
+    """Yield the job status each time it changes until preprocessing finishes.
+
+    Fails the job if its status does not change for PREPROCESS_TIMEOUT_SECONDS,
+    e.g. because the worker that was converting it died.
+    """
+    last, changed = None, time.time()
+    while True:
+        status = get_job_data(job_id, "status")
+        if status != last:
+            last, changed = status, time.time()
+            yield status
+        if status not in (JOB_QUEUED, JOB_CONVERTING):
+            return
+        if time.time() - changed > PREPROCESS_TIMEOUT_SECONDS:
+            # Compare-and-set: preprocessing may finish (or fail) right now
+            if store.job_compare_and_set(job_id, "status", status, JOB_FAILED):
+                update_job_data(job_id, "error", f"Preprocessing timed out while {status}")
+                raise Exception(f"Preprocessing timed out while {status}")
+        time.sleep(JOB_STATUS_POLL_SECONDS)
+
+
+# --- Janitor ---
+# DELETE /cleanup/<job_id> is never sent by closed tabs or crashed clients. Every
+# JANITOR_INTERVAL_SECONDS a background pass removes jobs idle for longer than
+# JOB_TTL_SECONDS, deletes {job_id}_* files whose job no longer exists (e.g. left
+# over from a restart; the first pass runs at startup) and, while job files in
+# UPLOAD_FOLDER exceed UPLOAD_QUOTA_BYTES, evicts the least recently active jobs.
+# It also drops result cache entries past CACHE_TTL_SECONDS. Orphans are only
+# reconciled with the sqlite store: an in-memory store can't see other
+# processes' jobs, so their files would look orphaned.
+
+JOB_FILE_RE = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_")
+janitor_stats = {"runs": 0, "last_run": None, "expired": 0, "quota": 0, "orphan": 0}
+
+
+def job_artifacts():
+    """Group job files in UPLOAD_FOLDER by job: {job_id: [(path, size, mtime), ...]}."""
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    artifacts = {}
+    try:
+        names = os.listdir(upload_dir)
+    except FileNotFoundError:
+        return artifacts
+    for name in names:
+        match = JOB_FILE_RE.match(name)
+        if not match:
+            continue
+        path = os.path.join(upload_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        artifacts.setdefault(match.group(1), []).append((path, st.st_size, st.st_mtime))
+    return artifacts
+
+
+def remove_artifacts(files):
+    for path, _, _ in files:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def run_janitor(now=None):
+    """One cleanup pass. Returns the number of jobs removed per reason."""
+    now = now or time.time()
+    removed = {"expired": 0, "quota": 0, "orphan": 0}
+    activity = store.job_activity()
+    live = {job_id: t for job_id, t in activity.items() if now - t <= JOB_TTL_SECONDS}
+    artifacts = job_artifacts()
+
+    for job_id in activity.keys() - live.keys():
+        cleanup_job(job_id)
+        remove_artifacts(artifacts.pop(job_id, []))  # Chunks and other unregistered leftovers
+        removed["expired"] += 1
+
+    orphans = [j for j in artifacts if j not in live] if STORE_BACKEND == "sqlite" else []
+    for job_id in orphans:
+        if now - max(mtime for _, _, mtime in artifacts[job_id]) > ORPHAN_GRACE_SECONDS:
+            remove_artifacts(artifacts.pop(job_id))
+            removed["orphan"] += 1
+
+    if UPLOAD_QUOTA_BYTES > 0:
+        total = sum(size for files in artifacts.values() for _, size, _ in files)
+        for job_id in sorted((j for j in artifacts if j in live), key=live.get):
+            if total <= UPLOAD_QUOTA_BYTES:
+                break
+            cleanup_job(job_id)
+            remove_artifacts(artifacts[job_id])
+            total -= sum(size for _, size, _ in artifacts.pop(job_id))
+            removed["quota"] += 1
+
+    evict_cache()  # Expire cache entries even when nothing new is being cached
+
+    for reason, n in removed.items():
+        if n:
+            inc_counter("transcripator_janitor_removed_jobs_total", n, reason=reason)
+            janitor_stats[reason] += n
+    janitor_stats["runs"] += 1
+    janitor_stats["last_run"] = now
+    return removed
+
+
+def janitor_loop():
+    while True:
+        try:
+            run_janitor()
+        except Exception as e:
+            app.logger.exception("Janitor pass failed: %s", e)
+        time.sleep(JANITOR_INTERVAL_SECONDS)
+
+
+def start_janitor():
+    """Start the janitor thread (called by the server entry points, not on import)."""
+    threading.Thread(target=janitor_loop, name="janitor", daemon=True).start()
+
+
+def disk_usage():
+    artifacts = job_artifacts()
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    return {
+        "upload_folder": upload_dir,
+        "job_files": sum(len(files) for files in artifacts.values()),
+        "job_bytes": sum(size for files in artifacts.values() for _, size, _ in files),
+        "jobs_with_files": len(artifacts),
+        "jobs": store.job_count(),
+        "quota_bytes": UPLOAD_QUOTA_BYTES,
+        "job_ttl_seconds": JOB_TTL_SECONDS,
+        "free_bytes": shutil.disk_usage(upload_dir).free if os.path.isdir(upload_dir) else None,
+        "cache_bytes": sum(size for _, size, _ in cache_usage()),
+        "janitor": dict(janitor_stats),
+    }
+
+
 # --- Routes ---
 
 @app.route("/")
@@ -253,16 +2002,10 @@ def index():
 @app.route("/generate-pow", methods=["POST"])
 def generate_pow():
     try:
-        cleanup_expired_pow()
         challenge = generate_challenge()
-        pow_id = generate_pow_id()
-        pow_store[pow_id] = {
-            "challenge": challenge,
-            "difficulty": POW_DIFFICULTY,
-            "expires": time.time() + POW_EXPIRES_SECONDS,
-            "solved": False,
-        }
-        return jsonify({"success": True, "pow_id": pow_id, "challenge": challenge, "difficulty": POW_DIFFICULTY})
+        difficulty = current_pow_difficulty()
+        pow_id = issue_pow_token(challenge, difficulty, int(time.time() + POW_EXPIRES_SECONDS))
+        return jsonify({"success": True, "pow_id": pow_id, "challenge": challenge, "difficulty": difficulty})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -277,26 +2020,17 @@ def validate_pow():
         if not pow_id or nonce is None:
             return jsonify({"success": False, "error": "Missing pow_id or nonce"}), 400
 
-        cleanup_expired_pow()
-
-        if pow_id not in pow_store:
+        fields = parse_pow_token(pow_id, "challenge")
+        if fields is None:
             return jsonify({"success": False, "error": "Invalid or expired PoW challenge"}), 400
-
-        pow_data = pow_store[pow_id]
-
-        if pow_data["expires"] > 0 and time.time() > pow_data["expires"]:
-            del pow_store[pow_id]
-            return jsonify({"success": False, "error": "PoW challenge has expired"}), 400
-
-        if pow_data.get("solved", False):
-            return jsonify({"success": True, "valid": True})
+        challenge, difficulty, expires = fields
 
         nonce = str(nonce)
-        if verify_pow(pow_data["challenge"], nonce, pow_data["difficulty"]):
-            pow_store[pow_id]["solved"] = True
-            pow_store[pow_id]["expires"] = 0
-            pow_store[pow_id]["validated_at"] = time.time()
-            return jsonify({"success": True, "valid": True})
+        if verify_pow(challenge, nonce, difficulty):
+            # The returned token replaces pow_id for the upload. Its expiry is fixed by the
+            # challenge, so every token minted from it shares one spent-set bucket
+            solved = issue_solved_token(challenge, expires + POW_VALIDATED_TTL)
+            return jsonify({"success": True, "valid": True, "pow_id": solved})
         else:
             return jsonify({"success": True, "valid": False})
     except Exception as e:
@@ -304,27 +2038,12 @@ def validate_pow():
 
 
 @app.route("/process-audio", methods=["POST"])
+@instrument_stage("process_audio")
 def process_audio():
     # PoW validation
-    pow_id = request.form.get("pow_id")
-    if not pow_id:
-        return jsonify({"error": "Proof-of-work validation required"}), 400
-
-    cleanup_expired_pow()
-
-    if pow_id not in pow_store:
-        return jsonify({"error": "Invalid or expired PoW challenge"}), 400
-
-    pow_data = pow_store[pow_id]
-    if pow_data["expires"] != 0 or not pow_data.get("solved", False):
-        return jsonify({"error": "PoW challenge not solved"}), 400
-
-    validated_at = pow_data.get("validated_at", 0)
-    if time.time() - validated_at > 300:
-        del pow_store[pow_id]
-        return jsonify({"error": "PoW validation expired"}), 400
-
-    del pow_store[pow_id]
+    pow_error = consume_pow(request.form.get("pow_id"))
+    if pow_error:
+        return jsonify({"error": pow_error}), 400
 
     if "audio" not in request.files:
         return jsonify({"error": "No audio file provided"}), 400
@@ -336,49 +2055,114 @@ def process_audio():
     if not allowed_file(file.filename, file.content_type):
         return jsonify({"error": "Unsupported audio format"}), 400
 
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
+    filename = secure_filename(file.filename)
+    try:
+        job_id = create_upload_job(file, filename, stage="process_audio")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "message": "File uploaded and queued for preprocessing.",
+        "job_id": job_id,
+        "filename": filename,
+        "status": get_job_data(job_id, "status"),
+    }), 202
+
+
+def stream_ingest_error(e):
+    """Response for a streaming upload that failed before its job was queued."""
+    if isinstance(e, ValueError):
+        return jsonify({"error": str(e)}), 400
+    # e.g. ClientDisconnected: the body broke off, the client may not even be listening
+    app.logger.warning("Streaming upload failed: %r", e)
+    return jsonify({"error": "Upload interrupted"}), 400
+
+
+@app.route("/process-audio/stream", methods=["POST"])
+@instrument_stage("process_audio_stream")
+def process_audio_stream():
+    """Streaming ingest: the raw request body is transcoded while it uploads.
+
+    Expects the file as the request body and pow_id/filename as query parameters.
+    """
+    pow_error = consume_pow(request.args.get("pow_id"))
+    if pow_error:
+        return jsonify({"error": pow_error}), 400
+
+    filename = secure_filename(request.args.get("filename", ""))
+    if not filename:
+        return jsonify({"error": "No selected file"}), 400
 
-    if file_size > MAX_FILE_SIZE:
+    if not allowed_file(filename, request.content_type):
+        return jsonify({"error": "Unsupported audio format"}), 400
+
+    if (request.content_length or 0) > MAX_FILE_SIZE:
         return jsonify({"error": "File too large. Maximum size is 100MB."}), 400
 
     job_id = generate_job_id()
-    filename = secure_filename(file.filename)
     upload_dir = app.config["UPLOAD_FOLDER"]
     os.makedirs(upload_dir, exist_ok=True)
-
-    original_file_path = os.path.join(upload_dir, f"{job_id}_{filename}")
-    file.save(original_file_path)
-
     save_job_data(job_id, "original_filename", filename)
-    save_job_data(job_id, "file_path", original_file_path)
-
-    processed_file_path = original_file_path
 
-    try:
-        # Convert if needed (video → audio)
-        converted = convert_to_supported_audio(original_file_path)
-        if converted != original_file_path:
-            save_job_data(job_id, "converted_path", converted)
-            processed_file_path = converted
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext not in STREAMABLE_EXTENSIONS or not streaming_transcodes.acquire(blocking=False):
+        # MP4-style containers may need seeking (moov atom at the end), and with every
+        # streaming slot busy the ffmpeg pool queues the work: spool to disk first
+        original_file_path = os.path.join(upload_dir, f"{job_id}_{filename}")
+        try:
+            content_hash, file_size = save_upload_hashed(request, original_file_path)
+        except Exception as e:
+            store.job_pop(job_id)  # The partial file is already gone
+            return stream_ingest_error(e)
+        save_job_data(job_id, "file_path", original_file_path)
+        save_job_data(job_id, "content_hash", content_hash)
+        start_preprocessing(job_id, content_hash, file_size)
+    else:
+        output_path = os.path.join(upload_dir, f"{job_id}_speech.ogg")
+        save_job_data(job_id, "converted_path", output_path)
+        save_job_data(job_id, "status", JOB_CONVERTING)
+        try:
+            proc, stderr_file, content_hash, file_size = pipe_upload_to_ffmpeg(request.stream, output_path)
+        except Exception as e:
+            streaming_transcodes.release()  # ffmpeg was already reaped
+            remove_job_files(store.job_pop(job_id))
+            return stream_ingest_error(e)
+        save_job_data(job_id, "content_hash", content_hash)
+        observe("transcripator_stage_bytes_in", file_size, stage="process_audio_stream")
+
+        cached_audio = cache_get_audio(content_hash)
+        if cached_audio:
+            # The transcode is not needed: stop it instead of waiting for it to finish
+            proc.kill()
+            proc.wait()
+            streaming_transcodes.release()
+            stderr_file.close()
+            remove_job_files(store.job_get_all(job_id))
+            store.job_delete_key(job_id, "converted_path")
+            use_cached_audio(job_id, cached_audio, file_size)
+        else:
+            if cache_enabled():
+                record_cache_lookup(False)
+            submit_preprocess(finish_streamed_job, job_id, proc, stderr_file, file_size)
 
-        # Compress if too large
-        compressed = compress_audio(processed_file_path)
-        if compressed != processed_file_path:
-            save_job_data(job_id, "compressed_path", compressed)
-            processed_file_path = compressed
+    return jsonify({
+        "message": "File uploaded and queued for preprocessing.",
+        "job_id": job_id,
+        "filename": filename,
+        "status": get_job_data(job_id, "status"),
+    }), 202
 
-        save_job_data(job_id, "processed_file_path", processed_file_path)
 
-        return jsonify({
-            "message": "File uploaded and preprocessed successfully.",
-            "job_id": job_id,
-            "filename": filename,
-        }), 200
-    except Exception as e:
-        cleanup_job(job_id)
-        return jsonify({"error": str(e)}), 500
+@app.route("/status/<job_id>")
+def status_endpoint(job_id):
+    if not job_exists(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({
+        "job_id": job_id,
+        "status": get_job_data(job_id, "status"),
+        "error": get_job_data(job_id, "error"),
+        "vad": {k: v for k, v in (get_job_data(job_id, "vad") or {}).items() if k != "offsets"} or None,
+    }), 200
 
 
 @app.route("/transcribe", methods=["POST"])
@@ -389,18 +2173,22 @@ def transcribe_endpoint():
     if not job_id:
         return jsonify({"error": "Job ID is required"}), 400
 
+    status = get_job_data(job_id, "status")
+    if status in (JOB_QUEUED, JOB_CONVERTING):
+        return jsonify({"error": "File is still being preprocessed", "status": status}), 409
+    if status == JOB_FAILED:
+        return jsonify({"error": get_job_data(job_id, "error"), "status": status}), 500
+
     file_path = get_job_data(job_id, "processed_file_path")
     if not file_path or not os.path.exists(file_path):
         return jsonify({"error": "File not found. Please upload again."}), 404
 
     try:
-        # Transcribe audio directly via Gemini
-        transcription = call_gemini_with_audio(
-            file_path,
-            "Transcribe this audio accurately. Return ONLY the transcription text, nothing else. "
-            "Use the same language as the audio.",
-        )
-        save_job_data(job_id, "original_transcription", transcription)
+        transcription = get_cached_result(job_id, "original_transcription")
+        if transcription is None:
+            # Transcribe audio directly via Gemini
+            transcription = call_gemini_with_audio(file_path, TRANSCRIBE_PROMPT)
+        save_result(job_id, "original_transcription", transcription)
         return jsonify({"job_id": job_id, "original_transcription": transcription}), 200
     except Exception as e:
         return jsonify({"error": f"Transcription failed: {str(e)}"}), 500
@@ -418,13 +2206,10 @@ def improve_endpoint():
         return jsonify({"error": "Transcription not found"}), 404
 
     try:
-        improved = call_gemini_text(
-            "You are a helpful assistant that improves transcriptions.",
-            f"Improve this transcription: fix grammar, spelling, punctuation. "
-            f"Improve readability while maintaining original meaning. "
-            f"Return ONLY the improved text.\n\n{transcription}",
-        )
-        save_job_data(job_id, "improved_transcription", improved)
+        improved = get_cached_result(job_id, "improved_transcription", transcription)
+        if improved is None:
+            improved = improve_text(transcription, job_id)
+        save_result(job_id, "improved_transcription", improved, transcription)
         return jsonify({"job_id": job_id, "improved_transcription": improved}), 200
     except Exception as e:
         return jsonify({"error": f"Improvement failed: {str(e)}"}), 500
@@ -442,13 +2227,10 @@ def summarize_endpoint():
         return jsonify({"error": "Transcription not found"}), 404
 
     try:
-        summary = call_gemini_text(
-            "You are a helpful assistant that summarizes transcriptions.",
-            f"Summarize this transcription using bullet points. "
-            f"Write from the perspective of the transcript. Use the same language. "
-            f"ONLY RETURN THE SUMMARY.\n\n{transcription}",
-        )
-        save_job_data(job_id, "summary", summary)
+        summary = get_cached_result(job_id, "summary", transcription)
+        if summary is None:
+            summary = summarize_text(transcription, job_id)
+        save_result(job_id, "summary", summary, transcription)
         return jsonify({"job_id": job_id, "summary": summary}), 200
     except Exception as e:
         return jsonify({"error": f"Summarization failed: {str(e)}"}), 500
@@ -456,31 +2238,10 @@ def summarize_endpoint():
 
 def stream_gemini_with_audio(file_path: str, prompt: str):
     """Stream audio transcription from Gemini via OpenRouter."""
-    with open(file_path, "rb") as f:
-        audio_b64 = base64.b64encode(f.read()).decode("utf-8")
-
-    ext = os.path.splitext(file_path)[1].lower().lstrip(".")
-    audio_format = AUDIO_FORMAT_MAP.get(ext, "ogg")
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-    }
-    payload = {
-        "model": OPENROUTER_MODEL,
-        "stream": True,
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "input_audio", "input_audio": {"data": audio_b64, "format": audio_format}},
-                    {"type": "text", "text": prompt},
-                ],
-            }
-        ],
-    }
-    response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=120, stream=True)
+    headers, body = build_audio_request(file_path, prompt, stream=True)
+    response = provider_post("openrouter", OPENROUTER_API_URL, timeout=120, stream=True, headers=headers, data=body)
     if response.status_code != 200:
+        response.close()
         raise Exception(f"OpenRouter API failed ({response.status_code}): {response.text}")
     return response
 
@@ -499,81 +2260,511 @@ def stream_gemini_text(system_prompt: str, user_prompt: str):
             {"role": "user", "content": user_prompt},
         ],
     }
-    response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=60, stream=True)
+    response = provider_post("openrouter", OPENROUTER_API_URL, timeout=60, stream=True, headers=headers, json=payload)
     if response.status_code != 200:
+        response.close()
         raise Exception(f"OpenRouter API failed ({response.status_code}): {response.text}")
     return response
 
 
 def iter_sse_tokens(response):
     """Iterate over SSE tokens from an OpenRouter streaming response."""
-    for line in response.iter_lines(decode_unicode=True):
-        if not line or not line.startswith("data: "):
-            continue
-        data_str = line[6:]
-        if data_str.strip() == "[DONE]":
-            break
-        try:
-            chunk = json.loads(data_str)
-            delta = chunk.get("choices", [{}])[0].get("delta", {})
-            token = delta.get("content")
-            if token:
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data_str = line[6:]
+            if data_str.strip() == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data_str)
+                delta = chunk.get("choices", [{}])[0].get("delta", {})
+                token = delta.get("content")
+                if token:
+                    yield token
+            except (json.JSONDecodeError, IndexError, KeyError):
+                continue
+    finally:
+        response.close()
+
+
+# --- Improvement ---
+# Output tokens are generated serially, so a long transcript is split into
+# paragraph-aligned windows (see split_text_stable) that are improved
+# concurrently (IMPROVE_WORKERS at a time). Each window sees the end of the
+# previous and the start of the next one as read-only context, so the seams
+# read naturally but nothing is returned twice and the outputs can simply be
+# concatenated. Windows are streamed in order: the first one live, each later
+# one as soon as everything before it is out. Improved windows are cached per
+# job by window hash, so after an edit only the changed windows are re-run.
+
+IMPROVE_SYSTEM_PROMPT = "You are a helpful assistant that improves transcriptions."
+
+
+def improve_prompt(transcription):
+    return (
+        f"Improve this transcription: fix grammar, spelling, punctuation. "
+        f"Improve readability while maintaining original meaning. "
+        f"Return ONLY the improved text.\n\n{transcription}"
+    )
+
+
+def window_improve_prompt(window, before, after):
+    return (
+        f"Improve one part of a longer transcription: fix grammar, spelling, punctuation. "
+        f"Improve readability while maintaining original meaning. The text before and after it "
+        f"is only context: do not include it in your answer. "
+        f"Return ONLY the improved part.\n\n"
+        f"Context before:\n{before or '(start of transcription)'}\n\n"
+        f"Part to improve:\n{window}\n\n"
+        f"Context after:\n{after or '(end of transcription)'}"
+    )
+
+
+def context_tail(text):
+    if len(text) <= IMPROVE_CONTEXT_CHARS:
+        return text
+    tail = text[-IMPROVE_CONTEXT_CHARS:]
+    return tail[tail.find(" ") + 1:]
+
+
+def context_head(text):
+    if len(text) <= IMPROVE_CONTEXT_CHARS:
+        return text
+    head = text[:IMPROVE_CONTEXT_CHARS]
+    return head[:head.rfind(" ")] if " " in head else head
+
+
+def stream_window(prompt, out):
+    """Stream one window's improved tokens into out, then None (or the exception)."""
+    try:
+        for token in strip_think_stream(iter_sse_tokens(stream_gemini_text(IMPROVE_SYSTEM_PROMPT, prompt))):
+            out.put(token)
+        out.put(None)
+    except Exception as e:
+        out.put(e)
+
+
+def stream_improvement(transcription, job_id=None):
+    """Yield improved text tokens in order, improving windows in parallel.
+
+    With a job_id, windows whose text is unchanged since the job's last
+    improvement are taken from its per-window cache instead of the model.
+    """
+    if estimate_tokens(transcription) <= IMPROVE_WINDOW_TOKENS:
+        windows = [("", transcription)]  # One call; the whole text is the cache key
+    else:
+        windows = split_text_stable(transcription, IMPROVE_WINDOW_TOKENS)
+    cached = (get_job_data(job_id, "improve_windows") if job_id else None) or {}
+    outputs = []
+    pool = ThreadPoolExecutor(max_workers=IMPROVE_WORKERS)
+    try:
+        for i, (_, window) in enumerate(windows):
+            if text_key(window) in cached:
+                outputs.append(cached[text_key(window)])
+                continue
+            if len(windows) == 1:
+                prompt = improve_prompt(window)
+            else:
+                before = context_tail(windows[i - 1][1]) if i > 0 else ""
+                after = context_head(windows[i + 1][1]) if i + 1 < len(windows) else ""
+                prompt = window_improve_prompt(window, before, after)
+            outputs.append(Queue())
+            pool.submit(stream_window, prompt, outputs[-1])
+
+        improved = {}
+        for (separator, window), out in zip(windows, outputs):
+            if improved:
+                yield separator
+            if isinstance(out, str):
+                improved[text_key(window)] = out
+                yield out
+                continue
+            parts = []
+            while (token := out.get()) is not None:
+                if isinstance(token, Exception):
+                    raise token
+                parts.append(token)
                 yield token
-        except (json.JSONDecodeError, IndexError, KeyError):
-            continue
+            improved[text_key(window)] = "".join(parts)
+        if job_id:
+            save_job_data(job_id, "improve_windows", improved)
+    finally:
+        # On failure, windows not started yet are dropped; running ones finish unobserved
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
-@app.route("/stream/<job_id>")
-def stream_endpoint(job_id):
-    if job_id not in job_store:
-        return jsonify({"error": "Job not found"}), 404
+def improve_text(transcription, job_id=None):
+    return "".join(stream_improvement(transcription, job_id))
+
+
+# --- Summarization ---
+# Transcripts that fit one token budget are summarized in a single call. Longer
+# ones are split into sections that are summarized concurrently (map), then the
+# partial summaries are merged (reduce), recursively if they are still too long.
+# Only the final reduce is streamed, so time-to-first-token stays roughly flat.
+# Section summaries are cached per job by section hash, so after an edit only
+# the changed sections are summarized again before the reduce.
+
+SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes transcriptions."
+
 
+def summary_prompt(transcription):
+    return (
+        f"Summarize this transcription using bullet points. "
+        f"Write from the perspective of the transcript. Use the same language. "
+        f"ONLY RETURN THE SUMMARY.\n\n{transcription}"
+    )
+
+
+def section_summary_prompt(section):
+    return (
+        f"This is one part of a longer transcription. Summarize it using bullet points, "
+        f"keeping names, numbers, decisions and action items. Use the same language. "
+        f"ONLY RETURN THE SUMMARY.\n\n{section}"
+    )
+
+
+def reduce_summary_prompt(partials):
+    joined = "\n\n".join(f"Part {i + 1}:\n{p}" for i, p in enumerate(partials))
+    return (
+        f"These are summaries of consecutive parts of one transcription. Merge them into a single "
+        f"summary using bullet points, removing repetition. Write from the perspective of the "
+        f"transcript. Use the same language. ONLY RETURN THE SUMMARY.\n\n{joined}"
+    )
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def text_units(text, max_chars):
+    """Split text into sentences (hard-wrapped at max_chars), each paired with the separator before it."""
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        first = True
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph.strip()):
+            while sentence:
+                cut = len(sentence)
+                if cut > max_chars:
+                    cut = sentence.rfind(" ", 0, max_chars)
+                    cut = cut if cut > 0 else max_chars
+                sep = "" if not units else ("\n\n" if first else " ")
+                units.append((sep, sentence[:cut]))
+                sentence = sentence[cut:].lstrip()
+                first = False
+    return units
+
+
+def split_text_stable(text, max_tokens):
+    """Split text into (separator, piece) pairs of at most ~max_tokens with content-defined boundaries.
+
+    Once a piece is a quarter full it ends before the next paragraph or after a
+    sentence whose hash selects it, so boundaries depend on nearby text only:
+    editing one sentence changes the piece containing it (rarely a neighbour too)
+    instead of shifting every later boundary. That keeps per-piece caches valid.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces, current, size, cut_after_last = [], [], 0, False
+    for sep, unit in text_units(text, max_chars):
+        if current and (size + len(sep) + len(unit) > max_chars
+                        or (size >= max_chars // 4 and (sep == "\n\n" or cut_after_last))):
+            pieces.append(current)
+            current, size = [], 0
+        current.append((sep, unit))
+        size += len(sep) + len(unit)
+        cut_after_last = hashlib.sha256(unit.encode("utf-8")).digest()[0] % 8 == 0
+    if current:
+        pieces.append(current)
+    return [(piece[0][0], piece[0][1] + "".join(sep + unit for sep, unit in piece[1:])) for piece in pieces]
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def map_summaries(texts, prompt_fn):
+    """Summarize texts concurrently, preserving order."""
+    with ThreadPoolExecutor(max_workers=SUMMARY_MAP_WORKERS) as pool:
+        return list(pool.map(lambda t: call_gemini_text(SUMMARY_SYSTEM_PROMPT, prompt_fn(t)), texts))
+
+
+def section_summaries(transcription, job_id=None):
+    """Summarize each section, reusing the job's cached summaries of unchanged sections."""
+    sections = [piece for _, piece in split_text_stable(transcription, SUMMARY_SECTION_TOKENS)]
+    cached = (get_job_data(job_id, "summary_sections") if job_id else None) or {}
+    missing = [section for section in sections if text_key(section) not in cached]
+    cached.update(zip(map(text_key, missing), map_summaries(missing, section_summary_prompt)))
+    partials = [cached[text_key(section)] for section in sections]
+    if job_id:
+        save_job_data(job_id, "summary_sections", dict(zip(map(text_key, sections), partials)))
+    return partials
+
+
+def build_summary_prompt(transcription, job_id=None):
+    """Run the map (and any intermediate reduce) phases; return the final prompt to send."""
+    if estimate_tokens(transcription) <= SUMMARY_SECTION_TOKENS:
+        return summary_prompt(transcription)
+    partials = section_summaries(transcription, job_id)
+    while estimate_tokens(reduce_summary_prompt(partials)) > SUMMARY_SECTION_TOKENS and len(partials) > 1:
+        groups, group = [], []
+        for partial in partials:
+            if group and estimate_tokens(reduce_summary_prompt(group + [partial])) > SUMMARY_SECTION_TOKENS:
+                groups.append(group)
+                group = []
+            group.append(partial)
+        groups.append(group)
+        if len(groups) == len(partials):
+            break  # Every partial is already at the budget; merge what we have
+        partials = map_summaries(groups, reduce_summary_prompt)
+    return reduce_summary_prompt(partials)
+
+
+def summarize_text(transcription, job_id=None):
+    return call_gemini_text(SUMMARY_SYSTEM_PROMPT, build_summary_prompt(transcription, job_id))
+
+
+def stream_summary(transcription, job_id=None):
+    """Yield summary tokens; only the final (reduce) pass is streamed."""
+    return iter_sse_tokens(stream_gemini_text(SUMMARY_SYSTEM_PROMPT, build_summary_prompt(transcription, job_id)))
+
+
+# --- Job pipeline ---
+# The transcribe -> improve -> summary pipeline runs once per job on a
+# background pool, independent of any HTTP connection, and appends every SSE
+# event to the job's event log. /stream/<job_id> replays the log after
+# Last-Event-ID and then follows it, so reconnects and extra tabs share one run.
+
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+FINAL_EVENT_PREFIXES = ('{"done"', '{"error"')
+
+
+def drain_tokens(tokens, out, stop):
+    """Put tokens on a queue, then None (or the exception raised); stop early once stop is set."""
+    try:
+        for token in tokens:
+            if stop.is_set():
+                break
+            out.put(token)
+        out.put(None)
+    except Exception as e:
+        out.put(e)
+    finally:
+        getattr(tokens, "close", lambda: None)()
+
+
+def coalesce_tokens(tokens):
+    """Batch tokens into one frame per SSE_COALESCE_SECONDS window or SSE_COALESCE_BYTES, whichever comes first.
+
+    The source is drained on a helper thread, so a frame goes out when its window
+    ends even if the next token is seconds away (e.g. while a <think> block is
+    stripped). A window of 0 passes tokens through unbatched.
+    """
+    if SSE_COALESCE_SECONDS <= 0:
+        yield from tokens
+        return
+    queue, stop = Queue(), threading.Event()
+    threading.Thread(target=drain_tokens, args=(tokens, queue, stop), daemon=True).start()
+    buffer, size, deadline = [], 0, None
+    try:
+        while True:
+            try:
+                token = queue.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+            except Empty:
+                token = ""  # Window over: flush below
+            if token is None:
+                break
+            if isinstance(token, Exception):
+                raise token
+            if deadline is None:
+                deadline = time.monotonic() + SSE_COALESCE_SECONDS
+            buffer.append(token)
+            size += len(token.encode("utf-8"))
+            if size >= SSE_COALESCE_BYTES or time.monotonic() >= deadline:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        stop.set()
+
+
+def pipeline_events(job_id):
+    """Yield the job's SSE events, running each stage or reusing cached results."""
+    # --- Preprocessing (background ffmpeg) ---
+    for status in wait_for_job_ready(job_id):
+        yield {"status": status}
+    if get_job_data(job_id, "status") == JOB_FAILED:
+        raise Exception(f"Preprocessing failed: {get_job_data(job_id, 'error')}")
     file_path = get_job_data(job_id, "processed_file_path")
     if not file_path or not os.path.exists(file_path):
-        return jsonify({"error": "File not found"}), 404
+        raise Exception("File not found")
+
+    # --- Transcription (Groq Whisper) ---
+    transcription_text = get_cached_result(job_id, "original_transcription")
+    if transcription_text is None:
+        media_info = get_job_data(job_id, "media_info") or {}
+        transcription_text = transcribe_audio(file_path, media_info.get("duration"))
+    save_result(job_id, "original_transcription", transcription_text)
+    # Stream transcription word by word, batched into frames
+    words = transcription_text.split(" ")
+    tokens = ((word + " ") if i < len(words) - 1 else word for i, word in enumerate(words))
+    for token in coalesce_tokens(tokens):
+        yield {"section": "transcription", "token": token}
+
+    # --- Improvement ---
+    improved_text = get_cached_result(job_id, "improved_transcription", transcription_text)
+    if improved_text is not None:
+        yield {"section": "improved", "token": improved_text}
+    else:
+        started = time.time()
+        full_improved = []
+        tokens = measure_token_stream("improve", stream_improvement(transcription_text, job_id), started)
+        for token in coalesce_tokens(tokens):
+            full_improved.append(token)
+            yield {"section": "improved", "token": token}
+        improved_text = "".join(full_improved)
+    save_result(job_id, "improved_transcription", improved_text, transcription_text)
+
+    # --- Summary ---
+    summary_text = get_cached_result(job_id, "summary", improved_text)
+    if summary_text is not None:
+        yield {"section": "summary", "token": summary_text}
+    else:
+        started = time.time()
+        full_summary = []
+        tokens = strip_think_stream(measure_token_stream("summary", stream_summary(improved_text, job_id), started))
+        for token in coalesce_tokens(tokens):
+            full_summary.append(token)
+            yield {"section": "summary", "token": token}
+        summary_text = "".join(full_summary)
+    save_result(job_id, "summary", summary_text, improved_text)
+
+
+class PipelineLease:
+    """A claim on a job's pipeline run, kept alive by a heartbeat from the moment it is taken.
+
+    The lease is stored as {"owner", "heartbeat"} and renewed with compare-and-set,
+    so once another reader takes a stale lease over (or the job is cleaned up)
+    the renewal fails and `lost` is set; the run then stops at its next event.
+    """
+
+    def __init__(self, job_id, value):
+        self.job_id = job_id
+        self.value = value
+        self.stop = threading.Event()
+        self.lost = threading.Event()
+        threading.Thread(target=self.keep_alive, name="lease", daemon=True).start()
+
+    def keep_alive(self):
+        while not self.stop.wait(PIPELINE_HEARTBEAT_SECONDS):
+            renewed = dict(self.value, heartbeat=time.time())
+            if not store.job_compare_and_set(self.job_id, "pipeline_lease", self.value, renewed):
+                self.lost.set()
+                return
+            self.value = renewed
+
+    def release(self):
+        self.stop.set()
+
+
+def claim_pipeline(job_id):
+    """Claim the job's pipeline run. Returns a PipelineLease if the caller should run it, else None.
+
+    A lease whose heartbeat went stale (the worker holding it died) is taken over.
+    """
+    now = time.time()
+    lease = {"owner": secrets.token_hex(8), "heartbeat": now}
+    if store.job_claim(job_id, "pipeline_lease", lease):
+        return PipelineLease(job_id, lease)
+    if get_job_data(job_id, "pipeline_finished"):
+        return None
+    current = get_job_data(job_id, "pipeline_lease")
+    if current is None or now - current["heartbeat"] <= PIPELINE_LEASE_SECONDS:
+        return None
+    if not store.job_compare_and_set(job_id, "pipeline_lease", current, lease):
+        return None  # Another reader took it over first
+    # Readers may already hold the dead run's partial output
+    store.events_append(job_id, json.dumps({"restarted": True}))
+    return PipelineLease(job_id, lease)
+
+
+def run_pipeline(job_id, lease):
+    """Run the job's pipeline to completion, logging each event and a final done/error event.
+
+    A failed run releases its lease and records its error event's id in
+    "pipeline_failed": the next /stream starts a fresh run (reusing cached stage
+    results) and reads the log from after that event.
+    """
+    track_inflight("pipelines", 1)
+    events = pipeline_events(job_id)
+    try:
+        try:
+            for event in events:
+                if lease.lost.is_set():
+                    return  # Taken over: the new owner logs from here on
+                store.events_append(job_id, json.dumps(event, ensure_ascii=False))
+        except Exception as e:
+            if lease.lost.is_set():
+                return
+            save_job_data(job_id, "error", str(e))
+            save_job_data(job_id, "pipeline_failed", store.events_append(job_id, json.dumps({"error": str(e)})))
+            store.job_delete_key(job_id, "pipeline_lease")
+            return
+        if lease.lost.is_set():
+            return
+        store.job_delete_key(job_id, "error")  # Left by an earlier failed run
+        store.events_append(job_id, json.dumps({"done": True}))
+        save_job_data(job_id, "pipeline_finished", True)
+    finally:
+        events.close()
+        lease.release()
+        track_inflight("pipelines", -1)
+
+
+def start_pipeline(job_id):
+    """Start the job's pipeline unless a live run (in any worker) already has it."""
+    lease = claim_pipeline(job_id)
+    if lease:
+        # The lease heartbeats while the run waits for a pipeline worker too
+        pipeline_executor.submit(run_pipeline, job_id, lease)
+
+
+@app.route("/stream/<job_id>")
+def stream_endpoint(job_id):
+    if not job_exists(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    if get_job_data(job_id, "status") == JOB_UPLOADING:
+        return jsonify({"error": "Upload not finalized"}), 409
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_event_id = 0
+    # Output from before the last failed run is stale: a retry starts over after its error
+    after = max(last_event_id, get_job_data(job_id, "pipeline_failed") or 0)
+    start_pipeline(job_id)
 
     def generate():
+        nonlocal after
+        track_inflight("streams", 1)
         try:
-            # --- Transcription (Groq Whisper) ---
-            transcription_text = transcribe_with_groq(file_path)
-            save_job_data(job_id, "original_transcription", transcription_text)
-            # Stream transcription token by token (word chunks)
-            words = transcription_text.split(" ")
-            for i, word in enumerate(words):
-                token = (word + " ") if i < len(words) - 1 else word
-                yield f"data: {json.dumps({'section': 'transcription', 'token': token}, ensure_ascii=False)}\n\n"
-
-            # --- Improvement ---
-            resp = stream_gemini_text(
-                "You are a helpful assistant that improves transcriptions.",
-                f"Improve this transcription: fix grammar, spelling, punctuation. "
-                f"Improve readability while maintaining original meaning. "
-                f"Return ONLY the improved text.\n\n{transcription_text}",
-            )
-            full_improved = []
-            for token in iter_sse_tokens(resp):
-                full_improved.append(token)
-                yield f"data: {json.dumps({'section': 'improved', 'token': token}, ensure_ascii=False)}\n\n"
-            improved_text = remove_think_tags("".join(full_improved))
-            save_job_data(job_id, "improved_transcription", improved_text)
-
-            # --- Summary ---
-            resp = stream_gemini_text(
-                "You are a helpful assistant that summarizes transcriptions.",
-                f"Summarize this transcription using bullet points. "
-                f"Write from the perspective of the transcript. Use the same language. "
-                f"ONLY RETURN THE SUMMARY.\n\n{improved_text}",
-            )
-            full_summary = []
-            for token in iter_sse_tokens(resp):
-                full_summary.append(token)
-                yield f"data: {json.dumps({'section': 'summary', 'token': token}, ensure_ascii=False)}\n\n"
-            summary_text = remove_think_tags("".join(full_summary))
-            save_job_data(job_id, "summary", summary_text)
-
-            yield f"data: {json.dumps({'done': True})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            while True:
+                events = store.events_since(job_id, after)
+                if not events:
+                    # Caught up: stop if the run is over (or the job was cleaned up), else wait for more
+                    if not job_exists(job_id) or get_job_data(job_id, "pipeline_finished"):
+                        return
+                    events = store.events_since(job_id, after, timeout=EVENT_KEEPALIVE_SECONDS)
+                    if not events:
+                        start_pipeline(job_id)  # Takes the run over if its worker stopped heartbeating
+                        yield ": keepalive\n\n"
+                        continue
+                for after, data in events:
+                    yield f"id: {after}\ndata: {data}\n\n"
+                    if data.startswith(FINAL_EVENT_PREFIXES):
+                        return
+        finally:
+            track_inflight("streams", -1)
 
     return Response(generate(), mimetype="text/event-stream", headers={
         "Cache-Control": "no-cache",
@@ -581,10 +2772,409 @@ def stream_endpoint(job_id):
     })
 
 
+# --- Chunked uploads ---
+# Resumable, parallel ingest for large files: POST /process-audio/chunked pays
+# the PoW and preallocates the file, PUT .../<job_id>/<index> writes one fixed-size
+# chunk in place at its offset (any order, several at once; verified against an
+# optional X-Chunk-SHA256 header), GET .../<job_id> lists the chunks received so
+# far so an interrupted client can send only the rest, and POST .../finalize
+# hands the file to preprocessing. Chunks land directly in the final file, so
+# finishing an upload copies nothing.
+
+
+def chunk_span(upload, index):
+    """(offset, length) of chunk index in an upload."""
+    offset = index * upload["chunk_size"]
+    return offset, min(upload["chunk_size"], upload["size"] - offset)
+
+
+def received_chunks(job_id):
+    return sorted(int(key[6:]) for key in store.job_get_all(job_id) if key.startswith("chunk_"))
+
+
+def write_chunk(stream, file_path, offset, length):
+    """Write exactly length bytes from stream at offset. Returns their sha256; raises ValueError on a size mismatch."""
+    digest = hashlib.sha256()
+    written = 0
+    with open(file_path, "r+b") as out:
+        out.seek(offset)
+        while written <= length:
+            data = stream.read(min(1024 * 1024, length + 1 - written))
+            if not data:
+                break
+            if written + len(data) > length:
+                raise ValueError(f"Chunk is larger than {length} bytes")
+            digest.update(data)
+            out.write(data)
+            written += len(data)
+    if written != length:
+        raise ValueError(f"Chunk has {written} bytes, expected {length}")
+    return digest.hexdigest()
+
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chunked_upload_state(job_id):
+    """Return (upload, error response) for a job that is still receiving chunks."""
+    upload = get_job_data(job_id, "upload")
+    if not upload:
+        return None, (jsonify({"error": "Upload not found"}), 404)
+    if get_job_data(job_id, "upload_finalized"):
+        return None, (jsonify({"error": "Upload already finalized"}), 409)
+    return upload, None
+
+
+@app.route("/process-audio/chunked", methods=["POST"])
+def chunked_upload_init():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    pow_error = consume_pow(data.get("pow_id"))
+    if pow_error:
+        return jsonify({"error": pow_error}), 400
+
+    filename = secure_filename(data.get("filename") or "")
+    if not filename:
+        return jsonify({"error": "No selected file"}), 400
+    if not allowed_file(filename, data.get("content_type")):
+        return jsonify({"error": "Unsupported audio format"}), 400
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "File size is required"}), 400
+    if size <= 0:
+        return jsonify({"error": "Empty file"}), 400
+    if size > MAX_FILE_SIZE:
+        return jsonify({"error": "File too large. Maximum size is 100MB."}), 400
+
+    job_id = generate_job_id()
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, f"{job_id}_{filename}")
+    with open(file_path, "wb") as f:
+        f.truncate(size)  # Sparse on most filesystems; chunks fill it in place
+
+    upload = {"size": size, "chunk_size": UPLOAD_CHUNK_BYTES, "chunks": -(-size // UPLOAD_CHUNK_BYTES)}
+    save_job_data(job_id, "original_filename", filename)
+    save_job_data(job_id, "file_path", file_path)
+    save_job_data(job_id, "upload", upload)
+    save_job_data(job_id, "status", JOB_UPLOADING)
+    return jsonify({"job_id": job_id, "filename": filename, **upload}), 201
+
+
+@app.route("/process-audio/chunked/<job_id>", methods=["GET"])
+def chunked_upload_status(job_id):
+    upload = get_job_data(job_id, "upload")
+    if not upload:
+        return jsonify({"error": "Upload not found"}), 404
+    return jsonify({
+        "job_id": job_id,
+        "status": get_job_data(job_id, "status"),
+        "received": received_chunks(job_id),
+        **upload,
+    }), 200
+
+
+@app.route("/process-audio/chunked/<job_id>/<int:index>", methods=["PUT"])
+def chunked_upload_chunk(job_id, index):
+    upload, error = chunked_upload_state(job_id)
+    if error:
+        return error
+    if index >= upload["chunks"]:
+        return jsonify({"error": f"Chunk index out of range (0-{upload['chunks'] - 1})"}), 400
+    offset, length = chunk_span(upload, index)
+    if request.content_length is not None and request.content_length != length:
+        return jsonify({"error": f"Chunk {index} must be {length} bytes"}), 400
+
+    # A failed or corrupt write invalidates whatever was stored for this chunk before
+    store.job_delete_key(job_id, f"chunk_{index}")
+    try:
+        checksum = write_chunk(request.stream, get_job_data(job_id, "file_path"), offset, length)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    expected = (request.headers.get("X-Chunk-SHA256") or "").lower()
+    if expected and not hmac.compare_digest(expected, checksum):
+        return jsonify({"error": f"Checksum mismatch for chunk {index}", "checksum_mismatch": True}), 400
+    save_job_data(job_id, f"chunk_{index}", checksum)
+    return jsonify({"index": index, "sha256": checksum}), 200
+
+
+@app.route("/process-audio/chunked/<job_id>/finalize", methods=["POST"])
+@instrument_stage("process_audio_chunked")
+def chunked_upload_finalize(job_id):
+    upload, error = chunked_upload_state(job_id)
+    if error:
+        return error
+    received = set(received_chunks(job_id))
+    missing = [i for i in range(upload["chunks"]) if i not in received]
+    if missing:
+        return jsonify({"error": "Upload incomplete", "missing": missing}), 409
+    if not store.job_claim(job_id, "upload_finalized", True):
+        return jsonify({"error": "Upload already finalized"}), 409
+
+    # One sequential read for the content hash (the result cache key); no copy
+    content_hash = hash_file(get_job_data(job_id, "file_path"))
+    for index in received:
+        store.job_delete_key(job_id, f"chunk_{index}")
+    save_job_data(job_id, "content_hash", content_hash)
+    observe("transcripator_stage_bytes_in", upload["size"], stage="process_audio_chunked")
+    start_preprocessing(job_id, content_hash, upload["size"])
+
+    return jsonify({
+        "message": "File uploaded and queued for preprocessing.",
+        "job_id": job_id,
+        "filename": get_job_data(job_id, "original_filename"),
+        "status": get_job_data(job_id, "status"),
+    }), 202
+
+
+# --- Batch processing ---
+# One PoW pays for many files (or a zip of them). Each file becomes a normal job
+# whose pipeline runs on BATCH_WORKERS shared threads. Clients are served
+# round-robin, so one large batch cannot starve everyone else's files.
+
+class FairQueue:
+    """Per-client FIFO queues drained round-robin by a fixed set of worker threads."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.cond = threading.Condition()
+        self.queues = {}  # client -> deque of (fn, args); dict order is the round-robin order
+        self.threads = []
+
+    def submit(self, client, fn, *args):
+        with self.cond:
+            if not self.threads:
+                # Started lazily so they are created after gevent has patched threading
+                self.threads = [
+                    threading.Thread(target=self.work, name=f"batch-{i}", daemon=True) for i in range(self.workers)
+                ]
+                for thread in self.threads:
+                    thread.start()
+            self.queues.setdefault(client, deque()).append((fn, args))
+            self.cond.notify()
+
+    def next_task(self):
+        with self.cond:
+            while not self.queues:
+                self.cond.wait()
+            client = next(iter(self.queues))
+            queue = self.queues.pop(client)
+            task = queue.popleft()
+            if queue:
+                self.queues[client] = queue  # Back of the line
+            return task
+
+    def queued(self):
+        with self.cond:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def work(self):
+        while True:
+            fn, args = self.next_task()
+            try:
+                fn(*args)
+            except Exception as e:
+                app.logger.exception("Batch task failed: %s", e)
+
+
+batch_queue = FairQueue(BATCH_WORKERS)
+
+
+def run_batch_job(job_id):
+    # Skip files whose job was cleaned up while queued, or already started by a /stream reader
+    lease = claim_pipeline(job_id) if job_exists(job_id) else None
+    if lease:
+        run_pipeline(job_id, lease)
+
+
+class BatchTooLarge(Exception):
+    """A batch's files, zip members counted uncompressed, add up to more than BATCH_MAX_BYTES."""
+
+
+class BudgetedReader:
+    """File-like view of one batch file that charges every byte read to the batch's shared budget.
+
+    The body limit only bounds zip archives compressed, so members are checked
+    against their declared sizes up front and against this budget while they
+    are copied, in case an archive lies about them.
+    """
+
+    def __init__(self, source, budget):
+        self.source = source
+        self.budget = budget
+
+    def read(self, size=-1):
+        chunk = self.source.read(size)
+        self.budget["left"] -= len(chunk)
+        if self.budget["left"] < 0:
+            raise BatchTooLarge()
+        return chunk
+
+
+def batch_items(uploads):
+    """Expand uploaded files and zip archives into (filename, opener) pairs.
+
+    Raises ValueError for a bad archive and BatchTooLarge if the members declare more than BATCH_MAX_BYTES.
+    """
+    items, budget, declared = [], {"left": BATCH_MAX_BYTES}, 0
+    for file in uploads:
+        if os.path.splitext(file.filename or "")[1].lower() == ".zip":
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                raise ValueError(f"Invalid zip archive: {file.filename}")
+            for info in archive.infolist():
+                if not info.is_dir():
+                    declared += info.file_size
+                    items.append((os.path.basename(info.filename),
+                                  lambda archive=archive, info=info: BudgetedReader(archive.open(info), budget)))
+        else:
+            items.append((file.filename, lambda file=file: BudgetedReader(file.stream, budget)))
+    if declared > BATCH_MAX_BYTES:
+        raise BatchTooLarge()
+    return items
+
+
+def batch_result(filename, job_id):
+    data = store.job_get_all(job_id)
+    if data.get("error"):
+        return {"file": filename, "job_id": job_id, "error": data["error"]}
+    return {
+        "file": filename,
+        "job_id": job_id,
+        "original_transcription": data.get("original_transcription"),
+        "improved_transcription": data.get("improved_transcription"),
+        "summary": data.get("summary"),
+    }
+
+
+@app.route("/batch", methods=["POST"])
+def batch_endpoint():
+    pow_error = consume_pow(request.form.get("pow_id"))
+    if pow_error:
+        return jsonify({"error": pow_error}), 400
+
+    uploads = [f for f in request.files.getlist("audio") if f.filename]
+    if not uploads:
+        return jsonify({"error": "No audio files provided"}), 400
+    too_large = {"error": f"Batch too large. Maximum is {BATCH_MAX_BYTES // (1024 * 1024)}MB of audio, "
+                          "counting zip archives uncompressed."}
+    try:
+        items = batch_items(uploads)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except BatchTooLarge:
+        return jsonify(too_large), 400
+    if len(items) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many files. Maximum is {BATCH_MAX_FILES} per batch."}), 400
+
+    client = request.remote_addr or ""  # Never the raw X-Forwarded-For: clients can set it (see TRUSTED_PROXIES)
+    results, pending = [], {}
+    for name, opener in items:
+        filename = secure_filename(name)
+        if not filename or not allowed_file(filename):
+            results.append({"file": name, "error": "Unsupported audio format"})
+            continue
+        try:
+            job_id = create_upload_job(opener(), filename, stage="batch")
+        except ValueError as e:
+            results.append({"file": name, "error": str(e)})
+            continue
+        except BatchTooLarge:
+            # An archive expanded past its declared sizes: drop the whole batch
+            for job_id in pending:
+                cleanup_job(job_id)
+            return jsonify(too_large), 400
+        pending[job_id] = name
+        batch_queue.submit(client, run_batch_job, job_id)
+
+    def generate():
+        for result in results:
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        # Results are sent as files finish, then the job is dropped (its text is in the result)
+        while pending:
+            done = [j for j in pending if get_job_data(j, "pipeline_finished") or get_job_data(j, "pipeline_failed")]
+            for job_id in done:
+                yield json.dumps(batch_result(pending.pop(job_id), job_id), ensure_ascii=False) + "\n"
+                cleanup_job(job_id)
+            if pending:
+                time.sleep(JOB_STATUS_POLL_SECONDS)
+
+    return Response(generate(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+def local_gauges():
+    """Gauges only this process knows; /metrics combines them across live workers."""
+    with inflight_lock:
+        inflight_now = dict(inflight)
+    return {"inflight": inflight_now, "batch_queued": batch_queue.queued(), "groq_p95": groq_p95_ratio() or 0}
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    merged_histograms, merged_counters, live = merged_metrics()
+    inflight_total = {}
+    for snapshot in live:
+        for kind, n in snapshot["gauges"]["inflight"].items():
+            inflight_total[kind] = inflight_total.get(kind, 0) + n
+    cache_entries = cache_usage()
+    gauges = [
+        ("transcripator_inflight_jobs", "Jobs currently preprocessing or streaming, summed over workers",
+         [((("kind", kind),), n) for kind, n in sorted(inflight_total.items())]),
+        ("transcripator_metrics_workers", "Workers that published metrics recently", [((), len(live))]),
+        ("transcripator_store_jobs", "Jobs in the job store", [((), store.job_count())]),
+        ("transcripator_batch_queued", "Batch files waiting for a worker",
+         [((), sum(snapshot["gauges"]["batch_queued"] for snapshot in live))]),
+        ("transcripator_groq_p95_seconds_per_audio_second",
+         "Recent Groq p95 latency per second of audio (hedge delay basis), highest over workers",
+         [((), max(snapshot["gauges"]["groq_p95"] for snapshot in live))]),
+        ("transcripator_job_files_bytes", "Size of job files in UPLOAD_FOLDER",
+         [((), sum(size for files in job_artifacts().values() for _, size, _ in files))]),
+        ("transcripator_store_pow_spent", "Spent PoW challenges awaiting expiry", [((), store.pow_spent_count())]),
+        ("transcripator_cache_bytes", "Size of the result cache on disk", [((), sum(size for _, size, _ in cache_entries))]),
+        ("transcripator_cache_entries", "Entries in the result cache", [((), len(cache_entries))]),
+    ]
+    return Response(render_metrics(merged_histograms, merged_counters, gauges), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache/stats")
+def cache_stats_endpoint():
+    entries = cache_usage()
+    merged_counters = merged_metrics()[1]
+    stats = {
+        "hits": merged_counters.get(("transcripator_cache_lookups_total", (("result", "hit"),)), 0),
+        "misses": merged_counters.get(("transcripator_cache_lookups_total", (("result", "miss"),)), 0),
+        "bytes_saved": merged_counters.get(("transcripator_cache_bytes_saved_total", ()), 0),
+    }
+    lookups = stats["hits"] + stats["misses"]
+    stats.update({
+        "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+        "entries": len(entries),
+        "size_bytes": sum(size for _, size, _ in entries),
+        "max_bytes": CACHE_MAX_BYTES,
+        "ttl_seconds": CACHE_TTL_SECONDS,
+    })
+    return jsonify(stats), 200
+
+
+@app.route("/disk/stats")
+def disk_stats_endpoint():
+    return jsonify(disk_usage()), 200
+
+
 @app.route("/cleanup/<job_id>", methods=["DELETE"])
 def cleanup_endpoint(job_id):
-    if not job_id or job_id not in job_store:
+    if not job_id or not job_exists(job_id):
         return jsonify({"error": "Job ID not found"}), 404
+    # The user asked for their data to go: that includes the cached audio and transcripts
+    cache_purge(get_job_data(job_id, "content_hash"))
     cleanup_job(job_id)
     return jsonify({"message": f"Cleaned up job {job_id}"}), 200
 
@@ -594,4 +3184,5 @@ if __name__ == "__main__":
         raise ValueError("OPENROUTER_API_KEY is not set")
 
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    start_janitor()
     app.run(debug=DEBUG, port=PORT, host="0.0.0.0")
@@ -0,0 +1,92 @@
+"""Peak memory per audio-to-Gemini request: in-memory JSON vs streamed body.
+
+Each variant runs in a fresh interpreter against a local server that accepts
+and discards the request, so ru_maxrss growth is attributable to building and
+sending one request.
+
+Usage:
+    python benchmarks/audio_body_memory.py [size_mb]
+"""
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class DiscardHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def legacy_request(app, file_path):
+    """The previous implementation: whole file base64-encoded into a dict."""
+    with open(file_path, "rb") as f:
+        audio_b64 = base64.b64encode(f.read()).decode("utf-8")
+    payload = {
+        "model": app.OPENROUTER_MODEL,
+        "messages": [{"role": "user", "content": [
+            {"type": "input_audio", "input_audio": {"data": audio_b64, "format": "ogg"}},
+            {"type": "text", "text": "Transcribe"},
+        ]}],
+    }
+    response = app.requests.post(app.OPENROUTER_API_URL, json=payload, timeout=120)
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def run_variant(variant, file_path):
+    import app
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DiscardHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app.OPENROUTER_API_URL = f"http://127.0.0.1:{server.server_port}/"
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if variant == "legacy":
+        legacy_request(app, file_path)
+    else:
+        app.call_gemini_with_audio(file_path, "Transcribe")
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print((peak_kb - baseline_kb) / 1024)
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] in ("legacy", "streaming"):
+        run_variant(sys.argv[1], sys.argv[2])
+        return
+
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as f:
+        f.write(os.urandom(int(size_mb * 1024 * 1024)))
+        file_path = f.name
+    try:
+        print(f"audio file: {size_mb:.0f} MB")
+        for variant in ("legacy", "streaming"):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), variant, file_path],
+                capture_output=True, text=True, check=True, cwd=ROOT,
+            )
+            print(f"{variant:<10} peak RSS growth per request: {float(out.stdout.strip()):8.1f} MB")
+    finally:
+        os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Local stand-ins for the Groq transcription and OpenRouter chat APIs.
+
+Groq (POST /openai/v1/audio/transcriptions): accepts the multipart upload and
+returns plain text whose length scales with the uploaded audio size.
+
+OpenRouter (POST /api/v1/chat/completions): returns a chat completion, or an
+SSE stream of delta tokens when "stream": true, emitted at --token-rate.
+
+Both apply --latency before responding and answer a --error-rate fraction of
+requests with 429 + Retry-After, to exercise the client retry path.
+
+Usage:
+    python benchmarks/fake_providers.py [--port 8900] [--latency 0.5] [--token-rate 80] [--error-rate 0.05]
+
+Then point the app at it:
+    GROQ_API_URL=http://127.0.0.1:8900/openai/v1/audio/transcriptions
+    OPENROUTER_API_URL=http://127.0.0.1:8900/api/v1/chat/completions
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the meeting covered budget timeline risks and next steps for the quarterly release "
+         "everyone agreed to follow up on open questions before friday").split()
+BYTES_PER_WORD = 1500  # ~ one spoken word per 1.5 KB of speech-rate Opus
+
+
+def fake_text(n_words):
+    return " ".join(random.choice(WORDS) for _ in range(max(1, n_words)))
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = {"latency": 0.5, "token_rate": 80.0, "error_rate": 0.0, "max_tokens": 400}
+    stats = {"requests": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.stats_lock:
+            self.stats["requests"] += 1
+        if random.random() < self.config["error_rate"]:
+            with self.stats_lock:
+                self.stats["rate_limited"] += 1
+            self.send_body(429, b'{"error": "rate limited"}', "application/json", [("Retry-After", "1")])
+            return
+        time.sleep(self.config["latency"])
+        if self.path.endswith("/audio/transcriptions"):
+            self.send_body(200, fake_text(len(body) // BYTES_PER_WORD).encode(), "text/plain")
+        elif self.path.endswith("/chat/completions"):
+            self.chat(json.loads(body or b"{}"))
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+    def chat(self, payload):
+        content = payload.get("messages", [{}])[-1].get("content", "")
+        prompt_words = len(content.split()) if isinstance(content, str) else 200
+        n_tokens = min(self.config["max_tokens"], max(20, prompt_words))
+        if not payload.get("stream"):
+            time.sleep(n_tokens / self.config["token_rate"])
+            message = {"choices": [{"message": {"content": fake_text(n_tokens)}}]}
+            self.send_body(200, json.dumps(message).encode(), "application/json")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1.0 / self.config["token_rate"]
+        for _ in range(n_tokens):
+            time.sleep(interval)
+            chunk = {"choices": [{"delta": {"content": random.choice(WORDS) + " "}}]}
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start(port=0, **config):
+    """Start the fake providers in a background thread; returns the server."""
+    FakeProviderHandler.config.update({k: v for k, v in config.items() if v is not None})
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeProviderHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def urls(server):
+    base = f"http://127.0.0.1:{server.server_port}"
+    return {
+        "GROQ_API_URL": f"{base}/openai/v1/audio/transcriptions",
+        "OPENROUTER_API_URL": f"{base}/api/v1/chat/completions",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first byte")
+    parser.add_argument("--token-rate", type=float, default=80.0, help="Streamed tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+    server = start(args.port, latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate)
+    for key, value in urls(server).items():
+        print(f"{key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare the legacy preprocessing chain with the single-pass media pipeline.
+
+Legacy: convert_to_supported_audio -> compress_audio -> compress_audio_for_groq
+New:    probe_media -> prepare_media
+
+The first two legacy steps are no longer part of the app and are kept here,
+unchanged, as the baseline.
+
+Synthetic inputs are generated with ffmpeg lavfi. For each input the script
+reports ffmpeg/ffprobe CPU time (children rusage), number of subprocess runs
+and the bytes that would be uploaded to the transcription provider.
+
+Usage:
+    python benchmarks/media_pipeline.py [duration_seconds ...]
+"""
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+INPUTS = {
+    "wav_stereo_44k": ["-f", "lavfi", "-i", "sine=frequency=220:sample_rate=44100",
+                       "-f", "lavfi", "-i", "anoisesrc=color=pink:amplitude=0.05:sample_rate=44100",
+                       "-filter_complex", "[0][1]amerge=inputs=2", "-c:a", "pcm_s16le"],
+    "mp4_h264_aac": ["-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=25",
+                     "-f", "lavfi", "-i", "sine=frequency=330:sample_rate=48000",
+                     "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "192k"],
+    "flac_mono_48k": ["-f", "lavfi", "-i", "anoisesrc=color=brown:amplitude=0.1:sample_rate=48000",
+                      "-c:a", "flac"],
+    "mp3_128k": ["-f", "lavfi", "-i", "sine=frequency=260:sample_rate=44100", "-c:a", "libmp3lame", "-b:a", "128k"],
+    "webm_vp8_opus": ["-f", "lavfi", "-i", "testsrc=size=640x360:rate=15",
+                      "-f", "lavfi", "-i", "sine=frequency=300:sample_rate=48000",
+                      "-c:v", "libvpx", "-deadline", "realtime", "-c:a", "libopus"],
+}
+EXTENSIONS = {
+    "wav_stereo_44k": "wav", "mp4_h264_aac": "mp4", "flac_mono_48k": "flac",
+    "mp3_128k": "mp3", "webm_vp8_opus": "webm",
+}
+
+
+def convert_to_supported_audio(file_path: str) -> str:
+    """Convert video/unsupported formats to ogg audio for Gemini."""
+    ext = os.path.splitext(file_path)[1].lower().lstrip(".")
+    if ext in app.AUDIO_FORMAT_MAP:
+        return file_path
+    # Convert to ogg opus
+    output_path = os.path.splitext(file_path)[0] + ".ogg"
+    try:
+        subprocess.run(
+            ["ffmpeg", "-i", file_path, "-vn", "-c:a", "libopus", "-b:a", "64k", "-y", output_path],
+            capture_output=True, text=True, timeout=300, check=True,
+        )
+        return output_path
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"FFmpeg conversion failed: {e.stderr}")
+
+
+def compress_audio(file_path: str, max_size: int = 24 * 1024 * 1024) -> str:
+    """Compress audio to under max_size."""
+    if os.path.getsize(file_path) <= max_size:
+        return file_path
+    duration = app.get_audio_duration(file_path)
+
+    target_kbps = max(16, min(128, int((max_size * 8) / duration) // 1000))
+    output_path = os.path.splitext(file_path)[0] + "_compressed.ogg"
+    subprocess.run(
+        ["ffmpeg", "-i", file_path, "-vn", "-c:a", "libopus", "-b:a", f"{target_kbps}k", "-y", output_path],
+        capture_output=True, text=True, timeout=300, check=True,
+    )
+    return output_path
+
+
+def child_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class CountingRun:
+    """Wraps subprocess.run to count ffmpeg/ffprobe invocations."""
+
+    def __init__(self):
+        self.calls = 0
+        self.real_run = subprocess.run
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.real_run(*args, **kwargs)
+
+
+def generate_input(workdir, name, duration):
+    path = os.path.join(workdir, f"{name}_{duration}s.{EXTENSIONS[name]}")
+    subprocess.run(["ffmpeg", "-v", "error", *INPUTS[name], "-t", str(duration), "-y", path], check=True)
+    return path
+
+
+def run_legacy(path):
+    outputs = []
+    converted = convert_to_supported_audio(path)
+    outputs.append(converted)
+    compressed = compress_audio(converted)
+    outputs.append(compressed)
+    upload = app.compress_audio_for_groq(compressed)
+    outputs.append(upload)
+    return upload, outputs
+
+
+def run_single_pass(path):
+    output = app.prepare_media(path, app.probe_media(path))
+    return output, [output]
+
+
+def measure(fn, src, workdir):
+    # Work on a private copy so both chains see identical, untouched input
+    path = os.path.join(workdir, "job_" + os.path.basename(src))
+    shutil.copyfile(src, path)
+    counter = CountingRun()
+    app.subprocess.run = counter
+    cpu_before = child_cpu_seconds()
+    outputs = []
+    try:
+        upload, outputs = fn(path)
+        cpu = child_cpu_seconds() - cpu_before
+        uploaded = os.path.getsize(upload)
+    finally:
+        app.subprocess.run = counter.real_run
+        for p in set(outputs + [path]):
+            if os.path.exists(p):
+                os.unlink(p)
+    return cpu, counter.calls, uploaded
+
+
+def main():
+    durations = [int(d) for d in sys.argv[1:]] or [300, 1800, 5400]
+    workdir = tempfile.mkdtemp(prefix="media_bench_")
+    print(f"{'input':<28}{'chain':<13}{'cpu_s':>9}{'runs':>6}{'upload_MB':>11}")
+    try:
+        for duration in durations:
+            for name in INPUTS:
+                src = generate_input(workdir, name, duration)
+                label = f"{name} {duration}s"
+                for chain, fn in (("legacy", run_legacy), ("single-pass", run_single_pass)):
+                    cpu, runs, uploaded = measure(fn, src, workdir)
+                    print(f"{label:<28}{chain:<13}{cpu:>9.2f}{runs:>6}{uploaded / 1e6:>11.2f}")
+                os.unlink(src)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""End-to-end offline load test of /process-audio + /stream/<job_id>.
+
+Starts the fake providers (benchmarks/fake_providers.py) and the app under
+gunicorn (or Werkzeug if gunicorn is not installed), generates synthetic inputs
+with ffmpeg lavfi, and drives full upload → stream runs at the given
+concurrency. No API credits are used.
+
+Reports per-input p50/p99 end-to-end latency, time to upload acceptance,
+throughput, peak server RSS (whole process tree) and peak temp-disk usage.
+
+Usage:
+    python benchmarks/pipeline_load.py --jobs 40 --concurrency 8 --durations 60,600 \
+        --inputs wav_stereo_44k,mp4_h264_aac --token-rate 80 --latency 0.5 --error-rate 0.05
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fake_providers
+from media_pipeline import INPUTS, generate_input
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port, workdir, provider_urls, workers):
+    env = dict(os.environ, **provider_urls)
+    env.update({
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "UPLOAD_FOLDER": os.path.join(workdir, "uploads"),
+        "STORE_BACKEND": "sqlite",
+        "STORE_PATH": os.path.join(workdir, "store.db"),
+        "CACHE_MAX_BYTES": "0",  # Every job must run the full pipeline
+        "POW_DIFFICULTY": "1",
+        "POW_MAX_DIFFICULTY": "1",
+        "OPENROUTER_API_KEY": "offline",
+        "GROQ_API_KEY": "offline",
+        "FLASK_ENV": "production",
+    })
+    os.makedirs(env["UPLOAD_FOLDER"], exist_ok=True)
+    if shutil.which("gunicorn"):
+        cmd = ["gunicorn", "app:app"]
+    else:
+        cmd = [sys.executable, "-c",
+               "from werkzeug.serving import run_simple; import app; "
+               f"run_simple('127.0.0.1', {port}, app.app, threaded=True)"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/status/none", timeout=1)
+            return proc, env["UPLOAD_FOLDER"]
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("App did not start")
+
+
+def process_tree_rss(pid):
+    """Sum VmRSS (bytes) of pid and all its descendants (Linux /proc)."""
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return total
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Sampler(threading.Thread):
+    def __init__(self, pid, upload_dir):
+        super().__init__(daemon=True)
+        self.pid, self.upload_dir = pid, upload_dir
+        self.peak_rss = self.peak_disk = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak_rss = max(self.peak_rss, process_tree_rss(self.pid))
+            self.peak_disk = max(self.peak_disk, dir_size(self.upload_dir))
+            time.sleep(0.2)
+
+
+def run_job(base, path):
+    session = requests.Session()
+    challenge = session.post(f"{base}/generate-pow", timeout=30).json()
+    nonce = 0
+    while not hashlib.sha256(f"{challenge['challenge']}{nonce}".encode()).hexdigest().startswith(
+            "0" * challenge["difficulty"]):
+        nonce += 1
+    solved = session.post(f"{base}/validate-pow", json={"pow_id": challenge["pow_id"], "nonce": nonce},
+                          timeout=30).json()
+
+    start = time.time()
+    with open(path, "rb") as f:
+        upload = session.post(f"{base}/process-audio", data={"pow_id": solved["pow_id"]},
+                              files={"audio": (os.path.basename(path), f)}, timeout=600)
+    accepted = time.time() - start
+    job_id = upload.json()["job_id"]
+    ok = False
+    with session.get(f"{base}/stream/{job_id}", stream=True, timeout=600) as stream:
+        for line in stream.iter_lines(decode_unicode=True):
+            if line.startswith("data: ") and ('"done": true' in line or '"error"' in line):
+                ok = '"done": true' in line
+                break
+    latency = time.time() - start
+    session.delete(f"{base}/cleanup/{job_id}", timeout=30)
+    return ok, accepted, latency
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs per input")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--durations", default="60,600")
+    parser.add_argument("--inputs", default=",".join(INPUTS))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-rate", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pipeline_load_")
+    providers = fake_providers.start(latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate)
+    port = free_port()
+    app_proc, upload_dir = start_app(port, workdir, fake_providers.urls(providers), args.workers)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        print(f"{'input':<26}{'jobs':>5}{'ok':>5}{'accept_p50':>11}{'p50_s':>8}{'p99_s':>8}"
+              f"{'jobs/min':>9}{'peak_rss_MB':>12}{'peak_disk_MB':>13}")
+        for duration in [int(d) for d in args.durations.split(",")]:
+            for name in args.inputs.split(","):
+                src = generate_input(workdir, name, duration)
+                sampler = Sampler(app_proc.pid, upload_dir)
+                sampler.start()
+                started = time.time()
+                with ThreadPoolExecutor(args.concurrency) as pool:
+                    results = list(pool.map(lambda _: run_job(base, src), range(args.jobs)))
+                elapsed = time.time() - started
+                sampler.running = False
+                sampler.join()
+                os.unlink(src)
+                latencies = [r[2] for r in results if r[0]]
+                print(f"{f'{name} {duration}s':<26}{args.jobs:>5}{len(latencies):>5}"
+                      f"{percentile([r[1] for r in results], 50):>11.2f}"
+                      f"{percentile(latencies, 50):>8.2f}{percentile(latencies, 99):>8.2f}"
+                      f"{len(latencies) / elapsed * 60:>9.1f}"
+                      f"{sampler.peak_rss / 1e6:>12.1f}{sampler.peak_disk / 1e6:>13.1f}")
+        stats = fake_providers.FakeProviderHandler.stats
+        print(f"provider requests: {stats['requests']}, injected 429s: {stats['rate_limited']}")
+    finally:
+        app_proc.send_signal(signal.SIGTERM)
+        app_proc.wait(timeout=30)
+        providers.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""SSE frames and CPU per job for different token coalescing windows.
+
+Runs the real job pipeline (transcribe -> improve -> summary) against the fake
+providers (started in a separate process so their CPU is not counted) and reads
+the whole /stream/<job_id> response, once per window setting. Reports frames,
+frames/s while streaming and process CPU time per job.
+
+Usage:
+    python benchmarks/sse_coalescing.py [--windows 0,30,50] [--words 4000] [--token-rate 100]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BYTES_PER_WORD = 1500  # Must match fake_providers.BYTES_PER_WORD
+PORT = 8931
+
+os.environ.update({
+    "CACHE_MAX_BYTES": "0",
+    "OPENROUTER_API_KEY": "offline",
+    "GROQ_API_KEY": "offline",
+    "GROQ_API_URL": f"http://127.0.0.1:{PORT}/openai/v1/audio/transcriptions",
+    "OPENROUTER_API_URL": f"http://127.0.0.1:{PORT}/api/v1/chat/completions",
+})
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+
+
+def new_job(audio_path):
+    job_id = app.generate_job_id()
+    app.save_job_data(job_id, "status", app.JOB_READY)
+    app.save_job_data(job_id, "processed_file_path", audio_path)
+    app.save_job_data(job_id, "media_info", {"duration": 60.0})
+    return job_id
+
+
+def run_job(client, audio_path):
+    job_id = new_job(audio_path)
+    cpu_before, started = time.process_time(), time.time()
+    body = client.get(f"/stream/{job_id}").get_data(as_text=True)
+    elapsed, cpu = time.time() - started, time.process_time() - cpu_before
+    app.store.job_pop(job_id)
+    frames = len(re.findall(r"^data: ", body, re.M))
+    return frames, len(body), elapsed, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", default="0,30,50", help="Coalescing windows in ms")
+    parser.add_argument("--words", type=int, default=4000, help="Approximate transcript length")
+    parser.add_argument("--token-rate", type=float, default=100.0)
+    parser.add_argument("--jobs", type=int, default=3)
+    args = parser.parse_args()
+
+    providers = subprocess.Popen([sys.executable, os.path.join(HERE, "fake_providers.py"), "--port", str(PORT),
+                                  "--latency", "0.05", "--token-rate", str(args.token_rate)],
+                                 stdout=subprocess.DEVNULL)
+    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as f:
+        f.write(b"\0" * args.words * BYTES_PER_WORD)
+        audio_path = f.name
+    try:
+        for _ in range(50):
+            try:
+                requests.get(f"http://127.0.0.1:{PORT}/", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        client = app.app.test_client()
+        print(f"{'window_ms':>10}{'frames':>8}{'sse_KB':>8}{'frames/s':>10}{'cpu_ms/job':>12}")
+        for window in [int(w) for w in args.windows.split(",")]:
+            app.SSE_COALESCE_SECONDS = window / 1000
+            runs = [run_job(client, audio_path) for _ in range(args.jobs)]
+            frames = sum(r[0] for r in runs) / len(runs)
+            size = sum(r[1] for r in runs) / len(runs)
+            rate = sum(r[0] for r in runs) / sum(r[2] for r in runs)
+            cpu = sum(r[3] for r in runs) / len(runs)
+            print(f"{window:>10}{frames:>8.0f}{size / 1024:>8.0f}{rate:>10.0f}{cpu * 1000:>12.0f}")
+    finally:
+        providers.terminate()
+        os.unlink(audio_path)
+
+
+if __name__ == "__main__":
+    main()
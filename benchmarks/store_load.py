@@ -0,0 +1,130 @@
+"""Load test: request throughput vs. number of worker processes on the SQLite store.
+
+Starts N app processes (each a threaded WSGI server, like gunicorn workers)
+sharing one SQLite database. Each client cycle hops across workers on purpose:
+generate-pow on one, validate-pow on the next, upload on a third and read the
+job status on a fourth, so every cycle also checks cross-worker visibility.
+
+Usage:
+    python benchmarks/store_load.py [--workers 1,2,4] [--clients 16] [--seconds 10]
+"""
+import argparse
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_PORT = 5600
+
+
+def serve(port, db_path, upload_dir):
+    os.environ.update({
+        "STORE_BACKEND": "sqlite",
+        "STORE_PATH": db_path,
+        "UPLOAD_FOLDER": upload_dir,
+        "CACHE_MAX_BYTES": "0",
+        "POW_DIFFICULTY": "1",
+    })
+    sys.path.insert(0, ROOT)
+    from werkzeug.serving import make_server
+
+    import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    make_server("127.0.0.1", port, app.app, threaded=True).serve_forever()
+
+
+def wait_until_up(ports):
+    for port in ports:
+        for _ in range(100):
+            try:
+                requests.get(f"http://127.0.0.1:{port}/status/none", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+
+def client_loop(ports, offset, deadline, counters):
+    session = requests.Session()
+    i = offset
+    while time.time() < deadline:
+        urls = [f"http://127.0.0.1:{ports[(i + k) % len(ports)]}" for k in range(4)]
+        i += 1
+        try:
+            pow_data = session.post(f"{urls[0]}/generate-pow", timeout=10).json()
+            nonce = 0
+            while not hashlib.sha256(f"{pow_data['challenge']}{nonce}".encode()).hexdigest().startswith(
+                    "0" * pow_data["difficulty"]):
+                nonce += 1
+            solved = session.post(f"{urls[1]}/validate-pow", json={"pow_id": pow_data["pow_id"], "nonce": nonce},
+                                  timeout=10)
+            solved.raise_for_status()
+            # The upload spends the solved token validate-pow returned, not the challenge
+            upload = session.post(
+                f"{urls[2]}/process-audio",
+                data={"pow_id": solved.json()["pow_id"]},
+                files={"audio": ("bench.mp3", io.BytesIO(os.urandom(2048)), "audio/mpeg")},
+                timeout=10,
+            )
+            upload.raise_for_status()
+            job_id = upload.json()["job_id"]
+            status = session.get(f"{urls[3]}/status/{job_id}", timeout=10)
+            counters["ok" if status.status_code == 200 else "lost"] += 1
+            session.delete(f"{urls[3]}/cleanup/{job_id}", timeout=10)
+        except Exception as e:
+            counters["errors"] += 1
+            counters["error_samples"].setdefault(str(e), 0)
+            counters["error_samples"][str(e)] += 1
+
+
+def run(workers, clients, seconds):
+    tmpdir = tempfile.mkdtemp(prefix="store_load_")
+    db_path = os.path.join(tmpdir, "store.db")
+    ports = [BASE_PORT + i for i in range(workers)]
+    procs = [multiprocessing.Process(target=serve, args=(p, db_path, tmpdir), daemon=True) for p in ports]
+    for p in procs:
+        p.start()
+    try:
+        wait_until_up(ports)
+        counters = {"ok": 0, "lost": 0, "errors": 0, "error_samples": {}}
+        deadline = time.time() + seconds
+        threads = [threading.Thread(target=client_loop, args=(ports, i, deadline, counters)) for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return counters
+    finally:
+        for p in procs:
+            p.terminate()
+            p.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'cycles/s':>10}{'req/s':>8}{'lost':>6}{'errors':>8}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        c = run(workers, args.clients, args.seconds)
+        rate = c["ok"] / args.seconds
+        # Each cycle is five requests: generate, validate, upload, status, cleanup
+        print(f"{workers:>8}{rate:>10.1f}{rate * 5:>8.1f}{c['lost']:>6}{c['errors']:>8}")
+        # A run that only errors measures nothing: show why the requests failed
+        for message, count in sorted(c["error_samples"].items(), key=lambda item: -item[1])[:3]:
+            print(f"{'':>8}{count}x {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Gunicorn settings.
+
+/stream/<job_id> keeps a connection open for the whole transcribe → improve →
+summarize pipeline, often several minutes. With the default gevent worker each
+stream is a greenlet instead of an OS thread: gevent patches sockets,
+subprocesses and sleeps, so upstream HTTP calls, SSE token iteration and
+ffmpeg runs all yield to other streams while they wait, and one process can
+hold hundreds of concurrent streams. Set GUNICORN_WORKER_CLASS=gthread to go
+back to a fixed thread pool per worker.
+
+Jobs, PoW secrets and spent challenges only reach every worker through a
+shared store, so several workers need STORE_BACKEND=sqlite: the default is one
+worker on the in-memory store, and more than one is refused.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+shared_store = os.getenv("STORE_BACKEND", "memory") == "sqlite"
+workers = int(os.getenv("WEB_CONCURRENCY", "4" if shared_store else "1"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))  # Per gevent worker
+threads = int(os.getenv("GUNICORN_THREADS", "4"))  # Per gthread worker
+timeout = 300
+
+
+def on_starting(server):
+    # Checked here rather than above so `gunicorn -w N` on the command line is caught too
+    if server.cfg.workers > 1 and not shared_store:
+        raise SystemExit(
+            f"{server.cfg.workers} workers need STORE_BACKEND=sqlite: each worker's in-memory store "
+            "would hold its own jobs and PoW secret (and its janitor would delete the others' uploads)"
+        )
+
+
+def post_worker_init(worker):
+    # Every worker runs the TTL/quota janitor; passes are idempotent across workers
+    from app import start_janitor
+
+    start_janitor()
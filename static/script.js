@@ -17,6 +17,11 @@ let isPowValid = false;
 let powWorker = null;
 let currentNonce = null;
 
+// Chunked upload variables (large files: parallel, resumable)
+const CHUNKED_UPLOAD_MIN_BYTES = 16 * 1024 * 1024;
+const CHUNK_PARALLELISM = 4;
+const CHUNK_MAX_ATTEMPTS = 8;
+
 // Retry variables
 let currentStep = 0;
 let retryAttempts = 0;
@@ -510,6 +515,8 @@ async function validatePow(nonce) {
         var result = await response.json();
 
         if (result.success && result.valid) {
+            // Signed proof of the solved challenge, sent with the upload
+            if (result.pow_id) currentPowId = result.pow_id;
             isPowValid = true;
             captchaStatus.textContent = '';
             var checkIcon = document.createElement('i');
@@ -674,13 +681,27 @@ async function processStep1() {
     updateCurrentStep(1, 'processing', 'Uploading and preprocessing...');
     updateOverallProgress(10);
 
-    if (!currentPowId) throw new Error('Security verification required.');
-
-    var formData = new FormData();
-    formData.append('audio', currentFile);
-    formData.append('pow_id', currentPowId);
-
-    var response = await fetch('/process-audio', { method: 'POST', body: formData });
+    var resuming = currentFile.size >= CHUNKED_UPLOAD_MIN_BYTES && localStorage.getItem(chunkedUploadKey(currentFile));
+    if (!currentPowId && !resuming) throw new Error('Security verification required.');
+
+    var response;
+    if (currentFile.size >= CHUNKED_UPLOAD_MIN_BYTES) {
+        // Large files: parallel chunks that survive dropped connections and page reloads
+        response = await uploadChunked(currentFile);
+    } else if (/\.(mp3|wav|ogg|webm|mkv|flac|aac|aiff)$/i.test(currentFile.name)) {
+        // Streaming ingest: the server transcodes while the body is still uploading
+        var params = new URLSearchParams({ pow_id: currentPowId, filename: currentFile.name });
+        response = await fetch('/process-audio/stream?' + params.toString(), {
+            method: 'POST',
+            headers: { 'Content-Type': currentFile.type || 'application/octet-stream' },
+            body: currentFile
+        });
+    } else {
+        var formData = new FormData();
+        formData.append('audio', currentFile);
+        formData.append('pow_id', currentPowId);
+        response = await fetch('/process-audio', { method: 'POST', body: formData });
+    }
 
     if (!response.ok) {
         var error = await response.json();
@@ -700,12 +721,110 @@ async function processStep1() {
     isPowValid = false;
     setTimeout(function() { generatePow(); }, 1000);
 
-    updateCurrentStep(1, 'completed', 'File uploaded successfully');
-    updateStepIndicator(1, 'completed');
-    updateOverallProgress(25);
+    if (result.status === 'ready') {
+        updateCurrentStep(1, 'completed', 'File uploaded successfully');
+        updateStepIndicator(1, 'completed');
+        updateOverallProgress(25);
+    } else {
+        updateCurrentStep(1, 'processing', 'Upload complete, preprocessing...');
+        updateOverallProgress(15);
+    }
     await delay(500);
 }
 
+function chunkedUploadKey(file) {
+    return 'upload:' + [file.name, file.size, file.lastModified].join(':');
+}
+
+async function resumableUpload(file) {
+    // Resume an unfinished upload of the same file (e.g. after a reload) without a new PoW
+    var saved = localStorage.getItem(chunkedUploadKey(file));
+    if (!saved) return null;
+    try {
+        var response = await fetch('/process-audio/chunked/' + saved);
+        if (response.ok) {
+            var upload = await response.json();
+            if (upload.status === 'uploading') return upload;
+        }
+    } catch (e) { /* Fall through to a fresh upload */ }
+    localStorage.removeItem(chunkedUploadKey(file));
+    return null;
+}
+
+async function chunkChecksum(blob) {
+    if (!window.crypto || !crypto.subtle) return null;  // Only available in secure contexts
+    var digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(function(b) { return b.toString(16).padStart(2, '0'); }).join('');
+}
+
+async function putChunk(upload, index, file) {
+    var start = index * upload.chunk_size;
+    var blob = file.slice(start, Math.min(start + upload.chunk_size, upload.size));
+    var headers = { 'Content-Type': 'application/octet-stream' };
+    var checksum = await chunkChecksum(blob);
+    if (checksum) headers['X-Chunk-SHA256'] = checksum;
+
+    for (var attempt = 1; ; attempt++) {
+        var response = null;
+        try {
+            response = await fetch('/process-audio/chunked/' + upload.job_id + '/' + index,
+                                   { method: 'PUT', headers: headers, body: blob });
+            if (response.ok) return;
+        } catch (e) { /* Network error: retry below */ }
+        if (response && response.status < 500 && response.status !== 429) {
+            // Only a checksum mismatch (corrupted in transit) is worth resending; other 4xx won't change
+            var error = await response.json().catch(function() { return {}; });
+            if (!error.checksum_mismatch) throw new Error(error.error || 'Chunk upload failed');
+        }
+        if (attempt >= CHUNK_MAX_ATTEMPTS) throw new Error('Upload interrupted. Retry to resume where it stopped.');
+        await delay(Math.min(30000, 1000 * Math.pow(2, attempt - 1)));
+    }
+}
+
+async function uploadChunked(file) {
+    var upload = await resumableUpload(file);
+    if (!upload) {
+        var response = await fetch('/process-audio/chunked', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ pow_id: currentPowId, filename: file.name, size: file.size, content_type: file.type })
+        });
+        if (!response.ok) return response;
+        upload = await response.json();
+        upload.received = [];
+        localStorage.setItem(chunkedUploadKey(file), upload.job_id);
+    }
+
+    var received = new Set(upload.received);
+    var pending = [];
+    for (var i = 0; i < upload.chunks; i++) {
+        if (!received.has(i)) pending.push(i);
+    }
+    var done = upload.chunks - pending.length;
+    function reportProgress() {
+        var pct = Math.round(done / upload.chunks * 100);
+        updateCurrentStep(1, 'processing', 'Uploading... ' + pct + '%');
+        updateOverallProgress(10 + Math.round(done / upload.chunks * 5));
+    }
+    reportProgress();
+
+    // A few chunks in flight keep the link busy while each request waits on its round trip
+    async function worker() {
+        while (pending.length) {
+            await putChunk(upload, pending.shift(), file);
+            done++;
+            reportProgress();
+        }
+    }
+    var workers = [];
+    for (var w = 0; w < CHUNK_PARALLELISM; w++) workers.push(worker());
+    await Promise.all(workers);
+
+    var result = await fetch('/process-audio/chunked/' + upload.job_id + '/finalize', { method: 'POST' });
+    if (result.ok) localStorage.removeItem(chunkedUploadKey(file));
+    return result;
+}
+
 function streamProcessing() {
     return new Promise(function(resolve, reject) {
         var currentSection = null;
@@ -717,10 +836,12 @@ function streamProcessing() {
         var accumulatedText = { transcription: '', improved: '', summary: '' };
 
         var source = new EventSource('/stream/' + currentJobId);
+        var reconnects = 0;
 
         source.onmessage = function(event) {
             var data;
             try { data = JSON.parse(event.data); } catch(e) { return; }
+            reconnects = 0;
 
             if (data.error) {
                 source.close();
@@ -728,6 +849,29 @@ function streamProcessing() {
                 return;
             }
 
+            // The server restarted the run after its worker died: its output starts over
+            if (data.restarted) {
+                currentSection = null;
+                accumulatedText = { transcription: '', improved: '', summary: '' };
+                return;
+            }
+
+            // Preprocessing progress (queued -> converting -> ready)
+            if (data.status) {
+                var statusMessages = {
+                    'queued': 'Waiting for preprocessing...',
+                    'converting': 'Converting audio...'
+                };
+                if (data.status === 'ready') {
+                    updateCurrentStep(1, 'completed', 'File uploaded successfully');
+                    updateStepIndicator(1, 'completed');
+                    updateOverallProgress(25);
+                } else if (statusMessages[data.status]) {
+                    updateCurrentStep(1, 'processing', statusMessages[data.status]);
+                }
+                return;
+            }
+
             if (data.done) {
                 // Finalize last section
                 if (currentSection) {
@@ -785,6 +929,10 @@ function streamProcessing() {
         };
 
         source.onerror = function() {
+            // The browser reconnects with Last-Event-ID and the server replays only what was missed
+            if (source.readyState === EventSource.CONNECTING && ++reconnects <= 5) {
+                return;
+            }
             source.close();
             if (currentSection) {
                 var info = sectionMap[currentSection];